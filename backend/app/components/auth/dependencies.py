@@ -1,10 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionLocal
 from app.components.auth.auth_utils import validate_token, TokenData
 from app.components.user.schema import UserSchema
+from app.components.user.cache import principal_cache
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,9 +13,12 @@ oauth2_bearer = HTTPBearer()
 
 def validate_access_token(
     http: HTTPAuthorizationCredentials = Depends(oauth2_bearer),
-    db: Session = Depends(get_db)
 ) -> TokenData:
-    """Dependency for validating the access token."""
+    """Dependency for validating the access token.
+
+    Users recently seen with Gmail connected are cached, so the common path
+    is just the JWT check; the database is only opened on a cache miss.
+    """
     if not http or not http.credentials:
         logger.error("No access token provided")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Access token is required")
@@ -27,15 +30,21 @@ def validate_access_token(
             logger.error("Invalid token type")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid token type")
 
-        # Verify user exists and has Gmail connected
-        user = db.query(UserSchema).filter(UserSchema.id == token_data.user_id).first()
-        if not user:
-            logger.error(f"User not found: {token_data.user_id}")
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-
-        if not user.google_access_token:
-            logger.error(f"User not connected to Gmail: {token_data.user_id}")
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not connected to Gmail")
+        if not principal_cache.get(token_data.user_id):
+            # Verify user exists and has Gmail connected
+            with SessionLocal() as db:
+                user = db.query(UserSchema.id, UserSchema.google_access_token).filter(
+                    UserSchema.id == token_data.user_id
+                ).first()
+            if not user:
+                logger.error(f"User not found: {token_data.user_id}")
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+            if not user.google_access_token:
+                logger.error(f"User not connected to Gmail: {token_data.user_id}")
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not connected to Gmail")
+
+            principal_cache.set(token_data.user_id, True)
 
         logger.info(f"Access token validated for user: {token_data.email}")
         return token_data
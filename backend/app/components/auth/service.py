@@ -1,14 +1,16 @@
+from datetime import datetime, timedelta, timezone
 import requests
 from sqlalchemy.orm import Session
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 
 from app.core.config import get_settings
 from app.core.security import encrypt_token
+from app.core.google_clients import build_client, make_credentials
 from app.core.logger import get_logger
 from app.components.user.schema import UserSchema
 from app.components.user.service import UserService
+from app.components.gmail.clients import gmail_clients
+from app.components.gmail.labels import label_cache
 from app.components.auth.auth_utils import create_access_token
 
 logger = get_logger(__name__)
@@ -71,16 +73,13 @@ class AuthService:
         if "error" in token_data:
             raise Exception(f"Token exchange failed: {token_data.get('error_description', token_data['error'])}")
 
-        credentials = Credentials(
-            token=token_data["access_token"],
-            refresh_token=token_data.get("refresh_token"),
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.google_client_id,
-            client_secret=settings.google_client_secret,
-        )
+        expiry = None
+        if token_data.get("expires_in"):
+            expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=int(token_data["expires_in"]))
+        credentials = make_credentials(token_data["access_token"], token_data.get("refresh_token"), expiry)
 
         # Get user info from Google
-        service = build("oauth2", "v2", credentials=credentials)
+        service = build_client("oauth2", "v2", credentials=credentials)
         user_info = service.userinfo().get().execute()
 
         email = user_info.get("email")
@@ -96,6 +95,7 @@ class AuthService:
             access_token=encrypted_access,
             refresh_token=encrypted_refresh,
             extraction_mode=extraction_mode,
+            token_expiry=expiry,
         )
 
         # Generate JWT access token
@@ -106,4 +106,6 @@ class AuthService:
 
     def logout(self, user_id: int) -> bool:
         """Clear user tokens on logout."""
+        gmail_clients.evict(user_id)
+        label_cache.evict(user_id)
         return self.user_service.clear_tokens(user_id)
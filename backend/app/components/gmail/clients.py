@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import Resource
+from googleapiclient.http import build_http
+
+from app.core.config import get_settings
+from app.core.google_clients import build_client, make_credentials
+from app.core.security import decrypt_token
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class GmailClient:
+    """A user's Gmail API client with a pool of keep-alive HTTP connections.
+
+    httplib2 connections aren't thread-safe, so each request borrows one for
+    its duration; idle ones are kept for the next request or sync.
+    """
+
+    def __init__(self, user_id: int, access_token: str, refresh_token: str | None, expiry: datetime | None = None):
+        self.user_id = user_id
+        self.credentials = make_credentials(access_token, refresh_token, expiry)
+        # Access token as last read from or written to the database
+        self.stored_token = access_token
+        self.service: Resource = build_client("gmail", "v1", credentials=self.credentials)
+        self._idle: list[AuthorizedHttp] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[AuthorizedHttp]:
+        """Borrow an authorized connection; it refreshes the shared credentials on 401."""
+        with self._lock:
+            http = self._idle.pop() if self._idle else None
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=build_http())
+        try:
+            yield http
+        finally:
+            with self._lock:
+                if len(self._idle) < settings.gmail_fetch_workers:
+                    self._idle.append(http)
+
+    def update_tokens(self, access_token: str, refresh_token: str | None, expiry: datetime | None = None):
+        """Swap in newly stored tokens without rebuilding the client or dropping connections."""
+        self.credentials.token = access_token
+        if refresh_token:
+            self.credentials._refresh_token = refresh_token
+        self.credentials.expiry = expiry
+        self.stored_token = access_token
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for http in idle:
+            for connection in http.http.connections.values():
+                connection.close()
+
+
+class GmailClientPool:
+    """Process-wide Gmail clients by user, least recently used evicted first."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # user ID -> (stored encrypted tokens the client was built from, client)
+        self._clients: OrderedDict[int, tuple[tuple[str | None, str | None], GmailClient]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        user_id: int,
+        encrypted_access: str | None,
+        encrypted_refresh: str | None,
+        expiry: datetime | None = None,
+    ) -> GmailClient:
+        """Client for a user's stored tokens, updating a pooled client in place if they changed."""
+        stored = (encrypted_access, encrypted_refresh)
+        with self._lock:
+            entry = self._clients.get(user_id)
+            if entry is not None:
+                self._clients.move_to_end(user_id)
+                if entry[0] == stored:
+                    return entry[1]
+
+        access_token = decrypt_token(encrypted_access)
+        refresh_token = decrypt_token(encrypted_refresh) if encrypted_refresh else None
+
+        with self._lock:
+            entry = self._clients.get(user_id)
+            if entry is not None:
+                client = entry[1]
+                if entry[0] != stored:
+                    client.update_tokens(access_token, refresh_token, expiry)
+            else:
+                client = GmailClient(user_id, access_token, refresh_token, expiry)
+            self._clients[user_id] = (stored, client)
+            self._clients.move_to_end(user_id)
+
+            evicted = []
+            while len(self._clients) > self.maxsize:
+                evicted.append(self._clients.popitem(last=False)[1][1])
+
+        for old in evicted:
+            old.close()
+        return client
+
+    def evict(self, user_id: int):
+        """Drop a user's client and its connections, e.g. on logout."""
+        with self._lock:
+            entry = self._clients.pop(user_id, None)
+        if entry is not None:
+            entry[1].close()
+
+
+gmail_clients = GmailClientPool(settings.gmail_client_cache_size)
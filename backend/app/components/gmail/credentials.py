@@ -0,0 +1,82 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import Request
+from googleapiclient.http import build_http
+
+from app.core.config import get_settings
+from app.core.security import encrypt_token
+from app.core.logger import get_logger
+from app.database import SessionLocal
+from app.components.user.service import UserService
+from app.components.gmail.clients import GmailClient
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class CredentialManager:
+    """Refreshes users' Google access tokens shortly before they expire and stores the new ones.
+
+    Refreshes for the same user are serialized, so threads that find the token
+    stale together wait for one refresh instead of each making their own.
+    """
+
+    def __init__(self, skew_secs: float):
+        self.skew = timedelta(seconds=skew_secs)
+        self._locks: dict[int, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _get_lock(self, user_id: int) -> threading.Lock:
+        with self._locks_lock:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[user_id] = lock
+            return lock
+
+    def needs_refresh(self, credentials: Credentials) -> bool:
+        """Whether the token is missing, of unknown age, or expires within the skew window."""
+        if not credentials.refresh_token:
+            return False
+        if not credentials.token or credentials.expiry is None:
+            return True
+        # google-auth keeps expiry as naive UTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - self.skew <= now
+
+    def ensure_fresh(self, client: GmailClient):
+        """Refresh the client's token if it's about to expire, and store any token not yet saved.
+
+        Tokens refreshed by AuthorizedHttp after a 401 are saved here too.
+        """
+        credentials = client.credentials
+        if not self.needs_refresh(credentials) and credentials.token == client.stored_token:
+            return
+
+        with self._get_lock(client.user_id):
+            # Another thread may have refreshed while this one waited
+            if self.needs_refresh(credentials):
+                credentials.refresh(Request(build_http()))
+                logger.info(f"Refreshed Google access token for user {client.user_id}")
+            if credentials.token != client.stored_token:
+                self._store(client)
+
+    def _store(self, client: GmailClient):
+        """Write the client's current tokens back to the user's row, encrypted."""
+        credentials = client.credentials
+        try:
+            with SessionLocal() as db:
+                UserService(db).update_tokens(
+                    client.user_id,
+                    encrypt_token(credentials.token),
+                    encrypt_token(credentials.refresh_token) if credentials.refresh_token else None,
+                    credentials.expiry,
+                )
+        except Exception as e:
+            # The refreshed token still works in memory; it's stored again after the next refresh
+            logger.error(f"Token write-back error for user {client.user_id}: {e}")
+        client.stored_token = credentials.token
+
+
+credential_manager = CredentialManager(settings.google_token_refresh_skew_secs)
@@ -0,0 +1,145 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from app.database import SessionLocal
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.components.user.schema import UserSchema
+from app.components.gmail.model import SyncJobStatus, SyncResponse
+from app.components.gmail.service import GmailSyncService
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Errors kept per job, matching the cap on SyncResponse
+MAX_JOB_ERRORS = 10
+
+
+class SyncJob:
+    """Progress of a background label sync."""
+
+    def __init__(self, user_id: int, label_id: str, full_scan: bool = False):
+        self.user_id = user_id
+        self.full_scan = full_scan
+        self._lock = threading.Lock()
+        self._status = SyncJobStatus(
+            job_id=uuid.uuid4().hex,
+            label_id=label_id,
+            status="queued",
+            created_at=datetime.now(timezone.utc),
+        )
+
+    @property
+    def job_id(self) -> str:
+        return self._status.job_id
+
+    @property
+    def label_id(self) -> str:
+        return self._status.label_id
+
+    @property
+    def is_active(self) -> bool:
+        return self._status.status in ("queued", "running")
+
+    def snapshot(self) -> SyncJobStatus:
+        """Returns a copy of the current status."""
+        with self._lock:
+            return self._status.model_copy(deep=True)
+
+    def start(self):
+        with self._lock:
+            self._status.status = "running"
+
+    def record_page(self, messages_scanned: int, emails_processed: int, invoices_extracted: int, errors: list[str]):
+        """Add the results of one processed page."""
+        with self._lock:
+            self._status.messages_scanned += messages_scanned
+            self._status.emails_processed += emails_processed
+            self._status.invoices_extracted += invoices_extracted
+            remaining = MAX_JOB_ERRORS - len(self._status.errors)
+            self._status.errors.extend(errors[:max(remaining, 0)])
+
+    def finish(self, result: SyncResponse):
+        with self._lock:
+            self._status.status = "completed"
+            self._status.emails_processed = result.emails_processed
+            self._status.invoices_extracted = result.invoices_extracted
+            self._status.errors = result.errors[:MAX_JOB_ERRORS]
+            self._status.finished_at = datetime.now(timezone.utc)
+
+    def fail(self, error: str):
+        with self._lock:
+            self._status.status = "failed"
+            if len(self._status.errors) < MAX_JOB_ERRORS:
+                self._status.errors.append(error)
+            self._status.finished_at = datetime.now(timezone.utc)
+
+
+class SyncJobManager:
+    """Runs label syncs on an in-process worker pool, one active job per user and label."""
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="gmail-sync")
+        self._jobs: dict[str, SyncJob] = {}
+        self._active: dict[tuple[int, str], str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: int, label_id: str, full_scan: bool = False) -> SyncJob:
+        """Queue a sync, or return the job already running for this user and label."""
+        with self._lock:
+            self._prune()
+
+            active_id = self._active.get((user_id, label_id))
+            if active_id:
+                logger.info(f"Sync already in progress for user {user_id}, label {label_id}")
+                return self._jobs[active_id]
+
+            job = SyncJob(user_id, label_id, full_scan)
+            self._jobs[job.job_id] = job
+            self._active[(user_id, label_id)] = job.job_id
+
+        self._executor.submit(self._run, job)
+        logger.info(f"Queued sync job {job.job_id} for user {user_id}, label {label_id}")
+        return job
+
+    def get(self, job_id: str, user_id: int) -> SyncJob | None:
+        """Get a job by ID if it belongs to the user."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job and job.user_id == user_id:
+            return job
+        return None
+
+    def _run(self, job: SyncJob):
+        """Run a sync job on its own database session."""
+        job.start()
+        db = SessionLocal()
+        try:
+            user = db.query(UserSchema).filter(UserSchema.id == job.user_id).first()
+            if not user:
+                raise ValueError("User not found")
+            service = GmailSyncService(db, user)
+            job.finish(service.sync_emails(job.label_id, job.full_scan, progress=job))
+            logger.info(f"Sync job {job.job_id} completed")
+        except Exception as e:
+            job.fail(f"Error syncing emails: {str(e)}")
+            logger.error(f"Sync job {job.job_id} failed: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._active.pop((job.user_id, job.label_id), None)
+
+    def _prune(self):
+        """Drop finished jobs past the retention window. Caller holds the lock."""
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.sync_job_retention_mins)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if not job.is_active and job.snapshot().finished_at < cutoff
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+
+
+sync_job_manager = SyncJobManager(settings.sync_job_workers)
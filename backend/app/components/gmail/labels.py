@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.components.gmail.model import GmailLabel
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class LabelEntry:
+    """A user's labels as last fetched from Gmail."""
+
+    def __init__(self, labels: list[GmailLabel]):
+        self.labels = labels
+        self.ids = {label.id for label in labels}
+        self.etag = '"' + hashlib.sha256(
+            "\n".join(f"{label.id}\t{label.name}" for label in labels).encode()
+        ).hexdigest()[:32] + '"'
+        self.fetched_at = time.monotonic()
+        self.stale = False
+
+
+class LabelCache:
+    """Per-user Gmail labels, fresh for `ttl` seconds.
+
+    After that, or once invalidated, the cached labels are still served for up
+    to `max_stale` seconds while one background refresh per user fetches new
+    ones. Past `max_stale` a request waits for Gmail again.
+    """
+
+    def __init__(self, ttl: float, max_stale: float, maxsize: int):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.maxsize = maxsize
+        self._entries: OrderedDict[int, LabelEntry] = OrderedDict()
+        self._refreshing: set[int] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gmail-labels")
+
+    def get(self, user_id: int, fetch: Callable[[int], list[GmailLabel]]) -> LabelEntry:
+        """A user's labels, calling `fetch(user_id)` inline only when nothing usable is cached."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                age = now - entry.fetched_at
+                if age < self.ttl and not entry.stale:
+                    return entry
+                if age < self.max_stale:
+                    if user_id not in self._refreshing:
+                        self._refreshing.add(user_id)
+                        self._executor.submit(self._refresh, user_id, fetch)
+                    return entry
+
+        return self._store(user_id, fetch(user_id))
+
+    def _refresh(self, user_id: int, fetch: Callable[[int], list[GmailLabel]]):
+        try:
+            self._store(user_id, fetch(user_id))
+        except Exception as e:
+            logger.error(f"Background label refresh error for user {user_id}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(user_id)
+
+    def _store(self, user_id: int, labels: list[GmailLabel]) -> LabelEntry:
+        entry = LabelEntry(labels)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: int):
+        """Mark a user's labels stale so the next read revalidates them."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.stale = True
+
+    def check_label_ids(self, user_id: int, label_ids: Iterable[str]):
+        """Invalidate a user's labels if a message carries a label they don't include."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.stale:
+                return
+            unknown = set(label_ids) - entry.ids
+            if not unknown:
+                return
+            entry.stale = True
+        logger.info(f"Unknown Gmail labels {sorted(unknown)} for user {user_id}, label cache invalidated")
+
+    def evict(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+label_cache = LabelCache(
+    ttl=settings.gmail_label_cache_secs,
+    max_stale=settings.gmail_label_max_stale_secs,
+    maxsize=settings.gmail_client_cache_size,
+)
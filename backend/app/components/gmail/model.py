@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import Literal
 from pydantic import BaseModel
 
 
@@ -8,9 +10,22 @@ class GmailLabel(BaseModel):
 
 class SyncRequest(BaseModel):
     label_id: str
+    full_scan: bool = False
 
 
 class SyncResponse(BaseModel):
     emails_processed: int
     invoices_extracted: int
     errors: list[str] = []
+
+
+class SyncJobStatus(BaseModel):
+    job_id: str
+    label_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    messages_scanned: int = 0
+    emails_processed: int = 0
+    invoices_extracted: int = 0
+    errors: list[str] = []
+    created_at: datetime
+    finished_at: datetime | None = None
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class RateLimiter:
+    """Thread-safe token bucket for Gmail API calls."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = max(capacity or rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until the requested number of calls may be made.
+
+        A request for more than the bucket holds (a Gmail batch larger than
+        one second's quota) waits for a full bucket and is then charged in
+        full. The bucket goes negative and later calls wait for it to refill,
+        so the configured rate holds on average.
+        """
+        if self.rate <= 0:
+            return
+
+        needed = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return
+                wait = (needed - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+# One bucket per user so concurrent syncs share the user's Gmail quota
+_limiters: dict[int, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(user_id: int) -> RateLimiter:
+    """Returns the shared rate limiter for a user."""
+    with _limiters_lock:
+        limiter = _limiters.get(user_id)
+        if limiter is None:
+            limiter = RateLimiter(settings.gmail_requests_per_second)
+            _limiters[user_id] = limiter
+        return limiter
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.components.gmail.model import GmailLabel, SyncRequest, SyncResponse
-from app.components.gmail.service import GmailSyncService
+from app.components.gmail.model import GmailLabel, SyncRequest, SyncJobStatus
+from app.components.gmail.service import fetch_labels
+from app.components.gmail.labels import label_cache
+from app.components.gmail.jobs import sync_job_manager
+from app.services.hybrid_extractor import EscalationMetrics, get_escalation_metrics
 from app.components.auth.dependencies import validate_access_token
 from app.components.auth.auth_utils import TokenData
 from app.components.user.schema import UserSchema
@@ -15,16 +18,22 @@ gmail_router = APIRouter(prefix="/gmail", tags=["Gmail"])
 
 @gmail_router.get("/labels", response_model=list[GmailLabel])
 def get_labels(
+    request: Request,
+    response: Response,
     token_data: TokenData = Depends(validate_access_token),
     db: Session = Depends(get_db),
 ):
-    """Get all Gmail labels for current user."""
+    """Get all Gmail labels for current user, from cache when possible."""
     try:
         user = db.query(UserSchema).filter(UserSchema.id == token_data.user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        service = GmailSyncService(db, user)
-        return service.get_labels()
+        entry = label_cache.get(user.id, fetch_labels)
+        if request.headers.get("if-none-match") == entry.etag:
+            return Response(status_code=304, headers={"ETag": entry.etag})
+        response.headers["ETag"] = entry.etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        return entry.labels
     except HTTPException:
         raise
     except Exception as e:
@@ -32,21 +41,31 @@ def get_labels(
         raise HTTPException(status_code=500, detail="Failed to fetch Gmail labels")
 
 
-@gmail_router.post("/sync", response_model=SyncResponse)
+@gmail_router.get("/extraction-metrics", response_model=EscalationMetrics)
+def get_extraction_metrics(
+    token_data: TokenData = Depends(validate_access_token),
+):
+    """Get how often hybrid extraction has escalated PDFs to OpenAI since startup."""
+    return get_escalation_metrics()
+
+
+@gmail_router.post("/sync", response_model=SyncJobStatus, status_code=202)
 def sync_emails(
     request: SyncRequest,
     token_data: TokenData = Depends(validate_access_token),
-    db: Session = Depends(get_db),
 ):
-    """Sync emails from label and extract invoices."""
-    try:
-        user = db.query(UserSchema).filter(UserSchema.id == token_data.user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        service = GmailSyncService(db, user)
-        return service.sync_emails(request.label_id)
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error syncing emails: {e}")
-        raise HTTPException(status_code=500, detail="Failed to sync emails")
+    """Queue a background sync of a label and return its job."""
+    job = sync_job_manager.submit(token_data.user_id, request.label_id, request.full_scan)
+    return job.snapshot()
+
+
+@gmail_router.get("/sync/{job_id}", response_model=SyncJobStatus)
+def get_sync_status(
+    job_id: str,
+    token_data: TokenData = Depends(validate_access_token),
+):
+    """Get progress of a sync job."""
+    job = sync_job_manager.get(job_id, token_data.user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job.snapshot()
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime, timezone
+from app.components.base.schemas import Base
+
+
+class GmailSyncStateSchema(Base):
+    __tablename__ = "gmail_sync_states"
+    __table_args__ = (UniqueConstraint("user_id", "label_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    label_id = Column(String, nullable=False)
+    page_token = Column(String, nullable=True)
+    history_id = Column(String, nullable=True)  # Set once a full scan completes
+    scan_history_id = Column(String, nullable=True)  # History ID when the running full scan started
+    retry_message_ids = Column(String, nullable=True)  # JSON {message ID: attempts} of messages that failed
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -1,59 +1,130 @@
 import base64
-from datetime import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from typing import Iterator
+from googleapiclient.errors import HttpError
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.core.config import get_settings
-from app.core.security import decrypt_token
+from app.core.security import needs_rotation, rotate_token
+from app.core.google_clients import build_client
 from app.core.logger import get_logger
 from app.components.user.schema import UserSchema
+from app.components.user.service import UserService
 from app.components.invoice.service import InvoiceService
 from app.components.invoice.model import InvoiceCreate
 from app.components.gmail.model import GmailLabel, SyncResponse
+from app.components.gmail.schema import GmailSyncStateSchema
+from app.components.gmail.rate_limiter import get_rate_limiter
+from app.components.gmail.clients import gmail_clients
+from app.components.gmail.credentials import credential_manager
+from app.components.gmail.labels import label_cache
+from app.services.pdf_extractor import PDFExtractor
 from app.services.local_extractor import LocalExtractor
+from app.services.extraction_executor import ProcessPoolExtractor
+from app.services.extraction_cache import ExtractionCache, CachedExtractor
 from app.services.openai_extractor import OpenAIExtractor
+from app.services.hybrid_extractor import HybridExtractor
+from app.services.vendor_templates import TemplateExtractor, VendorTemplateStore
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Gmail rejects batches of more than 100 calls
+MAX_BATCH_SIZE = 100
+
+# Deepest MIME nesting inspected when looking for PDF parts
+MAX_PART_DEPTH = 6
+
+# Syncs a failed message is tried in before it's given up on (a full scan still retries it)
+MAX_MESSAGE_ATTEMPTS = 3
+
+
+def _part_fields(depth: int) -> str:
+    """Partial-response field mask for a MIME part and its children, without body data."""
+    fields = "partId,mimeType,filename,body/attachmentId"
+    if depth > 0:
+        fields += f",parts({_part_fields(depth - 1)})"
+    return fields
+
+
+# Enough of a message to read its headers and labels and find PDF attachments
+TRIAGE_FIELDS = f"id,labelIds,payload(headers,{_part_fields(MAX_PART_DEPTH)})"
+
 
 class GmailSyncService:
     """Gmail sync operations service."""
 
-    def __init__(self, db: Session, user: UserSchema):
+    def __init__(self, db: Session, user: UserSchema, http=None):
+        """`http` replaces the Gmail transport, e.g. with an HttpMockSequence in tests."""
         self.db = db
         self.user = user
         self.invoice_service = InvoiceService(db)
-        self.gmail_service = self._build_gmail_service()
-
-    def _build_gmail_service(self):
-        """Build Gmail API service with user credentials."""
-        access_token = decrypt_token(self.user.google_access_token)
-        refresh_token = decrypt_token(self.user.google_refresh_token) if self.user.google_refresh_token else None
-
-        credentials = Credentials(
-            token=access_token,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.google_client_id,
-            client_secret=settings.google_client_secret,
-        )
-        return build("gmail", "v1", credentials=credentials)
+        self._rotate_stored_tokens()
+        if http is not None:
+            self.client = None
+            self.credentials = None
+            self.gmail_service = build_client("gmail", "v1", http=http)
+        else:
+            # Reused across syncs and requests, with its connections kept alive
+            self.client = gmail_clients.get(
+                user.id, user.google_access_token, user.google_refresh_token, user.google_token_expiry
+            )
+            self.credentials = self.client.credentials
+            self.gmail_service = self.client.service
+        self.rate_limiter = get_rate_limiter(user.id)
+        self._http = http
+
+    def _rotate_stored_tokens(self):
+        """Re-encrypt tokens still under a previous secret key with the current one."""
+        access, refresh = self.user.google_access_token, self.user.google_refresh_token
+        if not (needs_rotation(access) or needs_rotation(refresh)):
+            return
+        try:
+            UserService(self.db).update_tokens(self.user.id, rotate_token(access), rotate_token(refresh) or None)
+            logger.info(f"Re-encrypted stored tokens for user {self.user.id} with the current key")
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Token rotation error for user {self.user.id}: {e}")
+
+    @contextmanager
+    def _connection(self) -> Iterator:
+        """Borrow an HTTP connection from the user's pooled client (httplib2 is not thread-safe)."""
+        if self._http is not None:
+            yield self._http
+            return
+        credential_manager.ensure_fresh(self.client)
+        with self.client.connection() as http:
+            yield http
+
+    def _execute(self, request) -> dict:
+        """Execute a Gmail API request within the user's rate limit."""
+        self.rate_limiter.acquire()
+        with self._connection() as http:
+            return request.execute(http=http, num_retries=settings.gmail_max_retries)
 
     def get_labels(self) -> list[GmailLabel]:
         """Fetch all Gmail labels."""
         try:
-            results = self.gmail_service.users().labels().list(userId="me").execute()
+            results = self._execute(self.gmail_service.users().labels().list(userId="me"))
             labels = results.get("labels", [])
             return [GmailLabel(id=l["id"], name=l["name"]) for l in labels]
         except Exception as e:
             logger.error(f"Error fetching labels: {e}")
             raise
 
-    def sync_emails(self, label_id: str) -> SyncResponse:
-        """Sync emails from label and extract invoice data."""
+    def sync_emails(self, label_id: str, full_scan: bool = False, progress=None) -> SyncResponse:
+        """Sync emails from label and extract invoice data.
+
+        After the first full scan of a label, only messages added since the
+        last sync are fetched (via Gmail history), along with messages an
+        earlier sync failed on. `full_scan` forces a rescan.
+        `progress` (a SyncJob) is updated after every page.
+        """
         # Clear SQLAlchemy cache to get fresh data
         self.db.expire_all()
 
@@ -61,84 +132,78 @@ class GmailSyncService:
         invoices_extracted = 0
         errors = []
 
-        # Get extractor based on user preference
-        if self.user.extraction_mode == "openai" and settings.openai_api_key:
-            extractor = OpenAIExtractor(settings.openai_api_key)
-        else:
-            extractor = LocalExtractor()
+        extractor = self._get_extractor()
+
+        # Messages to retry next sync, by ID, with the number of syncs that failed on them
+        retries: dict[str, int] = {}
+        failed: dict[str, int] = {}
+
+        def process(message_ids: list[str]):
+            nonlocal emails_processed, invoices_extracted
+            processed, extracted, page_errors, page_failed = self._process_messages(message_ids, extractor)
+            emails_processed += processed
+            invoices_extracted += extracted
+            errors.extend(page_errors)
+            for msg_id in page_failed:
+                attempts = retries.get(msg_id, 0) + 1
+                if attempts < MAX_MESSAGE_ATTEMPTS:
+                    failed[msg_id] = attempts
+                else:
+                    logger.warning(f"Giving up on message {msg_id} after {attempts} failed syncs")
+            if progress:
+                progress.record_page(len(message_ids), processed, extracted, page_errors)
 
         try:
-            # Fetch message IDs with label
-            results = self.gmail_service.users().messages().list(
-                userId="me", labelIds=[label_id], maxResults=50
-            ).execute()
-            messages = results.get("messages", [])
-
-            for msg_info in messages:
-                msg_id = msg_info["id"]
-
-                try:
-                    # Fetch full message
-                    message = self.gmail_service.users().messages().get(
-                        userId="me", id=msg_id, format="full"
-                    ).execute()
-
-                    # Extract email metadata
-                    headers = message.get("payload", {}).get("headers", [])
-                    subject = next((h["value"] for h in headers if h["name"].lower() == "subject"), "")
-                    date_str = next((h["value"] for h in headers if h["name"].lower() == "date"), "")
-
-                    email_date = None
-                    if date_str:
-                        try:
-                            email_date = parsedate_to_datetime(date_str)
-                        except:
-                            pass
-
-                    # Find PDF attachments
-                    attachments = self._get_pdf_attachments(message)
-
-                    if not attachments:
-                        continue
-
-                    emails_processed += 1
-
-                    for filename, pdf_content in attachments:
-                        # Skip if this specific file already processed
-                        existing = self.invoice_service.get_by_email_id(msg_id, self.user.id, filename)
-                        if existing:
-                            logger.info(f"Skipping already processed: {filename}")
-                            continue
-
-                        try:
-                            extracted = extractor.extract(pdf_content)
-
-                            invoice_data = InvoiceCreate(
-                                email_id=msg_id,
-                                email_subject=subject,
-                                email_date=email_date,
-                                vendor_name=extracted.vendor_name,
-                                invoice_number=extracted.invoice_number,
-                                invoice_date=extracted.invoice_date,
-                                total_amount=extracted.total_amount,
-                                currency=extracted.currency,
-                                due_date=extracted.due_date,
-                                raw_text=extracted.raw_text[:2000] if extracted.raw_text else None,
-                                extraction_mode=self.user.extraction_mode,
-                                file_name=filename,
-                            )
-
-                            self.invoice_service.create(self.user.id, invoice_data)
-                            invoices_extracted += 1
-                            logger.info(f"Extracted invoice from {filename}")
-
-                        except Exception as e:
-                            errors.append(f"Error extracting {filename}: {str(e)}")
-                            logger.error(f"Extraction error: {e}")
-
-                except Exception as e:
-                    errors.append(f"Error processing message {msg_id}: {str(e)}")
-                    logger.error(f"Message processing error: {e}")
+            state = self._get_sync_state(label_id)
+            if full_scan:
+                state.history_id = None
+                state.scan_history_id = None
+                state.page_token = None
+                state.retry_message_ids = None
+                self.db.commit()
+
+            retries = json.loads(state.retry_message_ids or "{}")
+            scan_in_progress = bool(state.page_token or state.scan_history_id)
+            history = None
+            if state.history_id and not scan_in_progress:
+                history = self._list_history(label_id, state.history_id)
+
+            if history is not None:
+                new_ids, history_id = history
+                message_ids = list(dict.fromkeys(list(retries) + new_ids))
+                logger.info(
+                    f"Incremental sync of label {label_id}: {len(new_ids)} new messages, {len(retries)} to retry"
+                )
+
+                page_size = settings.gmail_page_size
+                for start in range(0, len(message_ids), page_size):
+                    process(message_ids[start:start + page_size])
+
+                # Failed messages are retried next time instead of holding back the history ID
+                state.history_id = history_id
+                state.retry_message_ids = json.dumps(failed) if failed else None
+                state.updated_at = datetime.now(timezone.utc)
+                self.db.commit()
+            else:
+                if scan_in_progress:
+                    logger.info(f"Resuming full sync of label {label_id}")
+                    # Failures on the pages scanned before the interruption
+                    failed.update(retries)
+                else:
+                    # Changes made while scanning are picked up by the next incremental sync
+                    state.scan_history_id = self._get_current_history_id()
+                    self.db.commit()
+
+                for message_ids, next_page_token in self._iter_message_pages(label_id, state.page_token):
+                    process(message_ids)
+
+                    # Page finished; an interrupted sync resumes from the next one
+                    state.retry_message_ids = json.dumps(failed) if failed else None
+                    self._save_page_token(state, next_page_token)
+
+                state.history_id = state.scan_history_id
+                state.scan_history_id = None
+                self.db.commit()
 
         except Exception as e:
             errors.append(f"Error syncing emails: {str(e)}")
@@ -150,9 +215,315 @@ class GmailSyncService:
             errors=errors[:10],  # Limit errors returned
         )
 
-    def _get_pdf_attachments(self, message: dict) -> list[tuple[str, bytes]]:
-        """Extract PDF attachments from email message."""
-        attachments = []
+    def _get_extractor(self) -> PDFExtractor:
+        """Get extractor based on user preference."""
+        if self.user.extraction_mode == "openai" and settings.openai_api_key:
+            extractor = OpenAIExtractor(settings.openai_api_key)
+        elif self.user.extraction_mode == "hybrid" and settings.openai_api_key:
+            # Runs local extraction inline so both tiers share each parsed PDF
+            extractor = HybridExtractor(LocalExtractor(), OpenAIExtractor(settings.openai_api_key))
+        else:
+            extractor = LocalExtractor()
+            if settings.extraction_workers > 0:
+                extractor = ProcessPoolExtractor(extractor)
+
+        if settings.vendor_templates_enabled:
+            extractor = TemplateExtractor(extractor, VendorTemplateStore(self.db, self.user.id))
+        if settings.extraction_cache_enabled:
+            extractor = CachedExtractor(extractor, ExtractionCache(self.db))
+        return extractor
+
+    def _get_sync_state(self, label_id: str) -> GmailSyncStateSchema:
+        """Get or create the sync state for a label."""
+        state = self.db.query(GmailSyncStateSchema).filter(
+            GmailSyncStateSchema.user_id == self.user.id,
+            GmailSyncStateSchema.label_id == label_id,
+        ).first()
+        if not state:
+            state = GmailSyncStateSchema(user_id=self.user.id, label_id=label_id)
+            self.db.add(state)
+            self.db.commit()
+            self.db.refresh(state)
+        return state
+
+    def _save_page_token(self, state: GmailSyncStateSchema, page_token: str | None):
+        """Persist the page token to resume from (None once the label is fully scanned)."""
+        state.page_token = page_token
+        state.updated_at = datetime.now(timezone.utc)
+        self.db.commit()
+
+    def _get_current_history_id(self) -> str:
+        """Returns the mailbox's current history ID."""
+        profile = self._execute(self.gmail_service.users().getProfile(userId="me"))
+        return profile["historyId"]
+
+    def _list_history(self, label_id: str, start_history_id: str) -> tuple[list[str], str] | None:
+        """List IDs of messages added to a label since a history ID.
+
+        Returns (message IDs, latest history ID), or None if the history ID
+        has expired and a full scan is needed.
+        """
+        message_ids = {}
+        history_id = start_history_id
+        page_token = None
+
+        while True:
+            try:
+                results = self._execute(self.gmail_service.users().history().list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    labelId=label_id,
+                    historyTypes=["messageAdded", "labelAdded"],
+                    maxResults=settings.gmail_page_size,
+                    pageToken=page_token,
+                ))
+            except HttpError as e:
+                if e.resp.status == 404:
+                    logger.warning(f"History {start_history_id} expired for label {label_id}, running full sync")
+                    return None
+                raise
+
+            for record in results.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    message = added["message"]
+                    if label_id in message.get("labelIds", []):
+                        message_ids[message["id"]] = None
+                for added in record.get("labelsAdded", []):
+                    if label_id in added.get("labelIds", []):
+                        message_ids[added["message"]["id"]] = None
+
+            history_id = results.get("historyId", history_id)
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+
+        return list(message_ids), history_id
+
+    def _iter_message_pages(self, label_id: str, page_token: str | None = None):
+        """Yield (message IDs, next page token) for each page of messages in a label."""
+        while True:
+            results = self._execute(self.gmail_service.users().messages().list(
+                userId="me", labelIds=[label_id], maxResults=settings.gmail_page_size, pageToken=page_token
+            ))
+            page_token = results.get("nextPageToken")
+            yield [m["id"] for m in results.get("messages", [])], page_token
+
+            if not page_token:
+                break
+
+    def _process_messages(self, message_ids: list[str], extractor) -> tuple[int, int, list[str], set[str]]:
+        """Triage messages, then download and extract their new PDF attachments.
+
+        Returns (emails processed, invoices extracted, errors, IDs of messages that failed).
+        """
+        emails_processed = 0
+        invoices_extracted = 0
+        errors = []
+        failed = set()
+
+        # Phase 1: fetch only headers and the MIME part tree, keep messages with PDFs
+        triaged = []
+        messages = self._fetch_messages(message_ids)
+        processed_keys = self.invoice_service.get_processed_keys(self.user.id, message_ids)
+        label_ids = set()
+        for msg_id in message_ids:
+            message, error = messages[msg_id]
+            if error:
+                errors.append(f"Error processing message {msg_id}: {str(error)}")
+                logger.error(f"Message processing error: {error}")
+                failed.add(msg_id)
+                continue
+            label_ids.update(message.get("labelIds", []))
+
+            pdf_parts = self._find_pdf_parts(message)
+            if not pdf_parts:
+                continue
+
+            new_parts = []
+            for filename, attachment_id in pdf_parts:
+                # Skip if this specific file already processed
+                if (msg_id, filename) in processed_keys:
+                    logger.info(f"Skipping already processed: {filename}")
+                    continue
+                new_parts.append((filename, attachment_id))
+            triaged.append((msg_id, message, new_parts))
+
+        # A label the cached list lacks means the user's labels changed
+        label_cache.check_label_ids(self.user.id, label_ids)
+
+        # Phase 2: download attachments only for the messages that survived triage
+        downloads = self._fetch_attachments([
+            (msg_id, attachment_id) for msg_id, _, new_parts in triaged for _, attachment_id in new_parts
+        ])
+
+        pending = []
+        for msg_id, message, new_parts in triaged:
+            try:
+                attachments = []
+                for filename, attachment_id in new_parts:
+                    content, error = downloads[(msg_id, attachment_id)]
+                    if error:
+                        raise error
+                    attachments.append((filename, content))
+
+                # Extract email metadata
+                headers = message.get("payload", {}).get("headers", [])
+                subject = next((h["value"] for h in headers if h["name"].lower() == "subject"), "")
+                date_str = next((h["value"] for h in headers if h["name"].lower() == "date"), "")
+
+                email_date = None
+                if date_str:
+                    try:
+                        email_date = parsedate_to_datetime(date_str)
+                    except:
+                        pass
+
+                emails_processed += 1
+                pending.extend((msg_id, subject, email_date, filename, content) for filename, content in attachments)
+
+            except Exception as e:
+                errors.append(f"Error processing message {msg_id}: {str(e)}")
+                logger.error(f"Message processing error: {e}")
+                failed.add(msg_id)
+
+        # Hand the whole page to the extractor so pooled extractors can work in parallel
+        invoices = []
+        results = extractor.extract_many([content for *_, content in pending])
+        for (msg_id, subject, email_date, filename, _), extracted in zip(pending, results):
+            try:
+                if isinstance(extracted, Exception):
+                    raise extracted
+
+                invoice_data = InvoiceCreate(
+                    email_id=msg_id,
+                    email_subject=subject,
+                    email_date=email_date,
+                    vendor_name=extracted.vendor_name,
+                    invoice_number=extracted.invoice_number,
+                    invoice_date=extracted.invoice_date,
+                    total_amount=extracted.total_amount,
+                    currency=extracted.currency,
+                    due_date=extracted.due_date,
+                    raw_text=extracted.raw_text[:2000] if extracted.raw_text else None,
+                    extraction_mode=self.user.extraction_mode,
+                    file_name=filename,
+                )
+
+                invoices.append(invoice_data)
+                logger.info(f"Extracted invoice from {filename}")
+
+            except Exception as e:
+                errors.append(f"Error extracting {filename}: {str(e)}")
+                logger.error(f"Extraction error: {e}")
+                failed.add(msg_id)
+
+        try:
+            invoices_extracted = self.invoice_service.bulk_create(self.user.id, invoices)
+        except Exception as e:
+            self.db.rollback()
+            errors.append(f"Error saving invoices: {str(e)}")
+            logger.error(f"Invoice save error: {e}")
+            failed.update(invoice.email_id for invoice in invoices)
+
+        return emails_processed, invoices_extracted, errors, failed
+
+    def _fetch_messages(self, message_ids: list[str]) -> dict:
+        """Fetch the headers and MIME part tree of messages (no body data).
+
+        Returns a mapping of message ID to a (message, error) tuple.
+        """
+        return self._execute_all({
+            msg_id: (lambda msg_id=msg_id: self.gmail_service.users().messages().get(
+                userId="me", id=msg_id, format="full", fields=TRIAGE_FIELDS
+            ))
+            for msg_id in message_ids
+        })
+
+    def _fetch_attachments(self, attachment_keys: list[tuple[str, str]]) -> dict:
+        """Download attachments by (message ID, attachment ID).
+
+        Returns a mapping of each key to a (content, error) tuple.
+        """
+        results = self._execute_all({
+            (msg_id, attachment_id): (
+                lambda msg_id=msg_id, attachment_id=attachment_id:
+                self.gmail_service.users().messages().attachments().get(
+                    userId="me", messageId=msg_id, id=attachment_id
+                )
+            )
+            for msg_id, attachment_id in attachment_keys
+        })
+
+        downloads = {}
+        for key, (att, error) in results.items():
+            if error:
+                downloads[key] = (None, error)
+                continue
+            try:
+                downloads[key] = (base64.urlsafe_b64decode(att.get("data", "")), None)
+            except Exception as e:
+                downloads[key] = (None, e)
+        return downloads
+
+    def _execute_all(self, request_factories: dict) -> dict:
+        """Execute requests as Gmail batches spread over the fetch workers.
+
+        Returns a mapping of each key to a (response, error) tuple.
+        """
+        keys = list(request_factories)
+        batch_size = max(1, min(settings.gmail_batch_size, MAX_BATCH_SIZE))
+        chunks = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+        if not chunks:
+            return {}
+
+        results = {}
+        workers = max(1, min(settings.gmail_fetch_workers, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gmail-fetch") as executor:
+            for chunk_results in executor.map(
+                lambda chunk: self._execute_batch({key: request_factories[key] for key in chunk}),
+                chunks,
+            ):
+                results.update(chunk_results)
+        return results
+
+    def _execute_batch(self, request_factories: dict) -> dict:
+        """Execute requests in one Gmail batch call, retrying failed parts individually.
+
+        Returns a mapping of each key to a (response, error) tuple.
+        """
+        results = {}
+        request_ids = {str(i): key for i, key in enumerate(request_factories)}
+        responses = {}
+
+        def callback(request_id, response, exception):
+            responses[request_ids[request_id]] = (response, exception)
+
+        batch = self.gmail_service.new_batch_http_request(callback=callback)
+        for request_id, key in request_ids.items():
+            batch.add(request_factories[key](), request_id=request_id)
+
+        try:
+            self.rate_limiter.acquire(len(request_ids))
+            with self._connection() as http:
+                batch.execute(http=http)
+        except Exception as e:
+            logger.warning(f"Batch request failed, falling back to individual calls: {e}")
+
+        for key, factory in request_factories.items():
+            response, error = responses.get(key, (None, None))
+            if error is None and response is not None:
+                results[key] = (response, None)
+                continue
+            try:
+                results[key] = (self._execute(factory()), None)
+            except Exception as e:
+                results[key] = (None, e)
+
+        return results
+
+    def _find_pdf_parts(self, message: dict) -> list[tuple[str, str]]:
+        """Find (filename, attachment ID) pairs for PDF attachments in a message."""
+        pdf_parts = []
         payload = message.get("payload", {})
 
         def process_parts(parts):
@@ -161,16 +532,9 @@ class GmailSyncService:
                 mime_type = part.get("mimeType", "")
 
                 if filename.lower().endswith(".pdf") or mime_type == "application/pdf":
-                    body = part.get("body", {})
-                    attachment_id = body.get("attachmentId")
-
+                    attachment_id = part.get("body", {}).get("attachmentId")
                     if attachment_id:
-                        att = self.gmail_service.users().messages().attachments().get(
-                            userId="me", messageId=message["id"], id=attachment_id
-                        ).execute()
-                        data = att.get("data", "")
-                        content = base64.urlsafe_b64decode(data)
-                        attachments.append((filename or "attachment.pdf", content))
+                        pdf_parts.append((filename or "attachment.pdf", attachment_id))
 
                 # Recurse into nested parts
                 if "parts" in part:
@@ -179,4 +543,13 @@ class GmailSyncService:
         if "parts" in payload:
             process_parts(payload["parts"])
 
-        return attachments
+        return pdf_parts
+
+
+def fetch_labels(user_id: int) -> list[GmailLabel]:
+    """Fetch a user's labels from Gmail in a session of its own, e.g. for a background refresh."""
+    with SessionLocal() as db:
+        user = UserService(db).get_by_id(user_id)
+        if not user or not user.google_access_token:
+            raise ValueError(f"User {user_id} has no Gmail connection")
+        return GmailSyncService(db, user).get_labels()
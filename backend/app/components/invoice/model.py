@@ -22,9 +22,10 @@ class InvoiceResponse(BaseModel):
 
 class InvoiceListResponse(BaseModel):
     items: list[InvoiceResponse]
-    total: int
-    page: int
+    total: int | None  # None when include_total=false
+    page: int | None  # None for cursor requests
     limit: int
+    next_cursor: str | None = None  # Pass as ?cursor= for the next page; None on the last page
 
 
 class InvoiceCreate(BaseModel):
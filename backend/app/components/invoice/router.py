@@ -1,10 +1,12 @@
+from datetime import date
+from typing import Literal
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.components.invoice.model import InvoiceResponse, InvoiceListResponse
-from app.components.invoice.service import InvoiceService
+from app.components.invoice.service import InvoiceService, EXPORT_COLUMNS
 from app.components.auth.dependencies import validate_access_token
 from app.components.auth.auth_utils import TokenData
 
@@ -19,24 +21,59 @@ def get_invoice_service(db: Session = Depends(get_db)) -> InvoiceService:
 def list_invoices(
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=1000),
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page; overrides page"),
+    include_total: bool = Query(default=True),
     token_data: TokenData = Depends(validate_access_token),
     service: InvoiceService = Depends(get_invoice_service),
 ):
     """List all invoices for current user."""
-    return service.list_invoices(token_data.user_id, page, limit)
+    try:
+        return service.list_invoices(token_data.user_id, page, limit, cursor, include_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
 
 
 @invoice_router.get("/export")
-def export_csv(
+def export_invoices(
+    format: Literal["csv", "jsonl", "parquet"] = Query(default="csv"),
+    columns: str | None = Query(default=None, description="Comma-separated columns to export"),
+    date_from: date | None = Query(default=None, description="Earliest email date, inclusive"),
+    date_to: date | None = Query(default=None, description="Latest email date, inclusive"),
     token_data: TokenData = Depends(validate_access_token),
     service: InvoiceService = Depends(get_invoice_service),
 ):
-    """Export all invoices as CSV."""
-    csv_data = service.export_csv(token_data.user_id)
-    return Response(
-        content=csv_data,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=invoices.csv"},
+    """Export invoices as CSV, JSON Lines or Parquet, streamed in batches."""
+    selected = None
+    if columns:
+        selected = [name.strip() for name in columns.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in EXPORT_COLUMNS]
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown export columns: {', '.join(unknown)}. Choose from: {', '.join(EXPORT_COLUMNS)}",
+            )
+
+    if format == "parquet":
+        try:
+            content = service.stream_parquet(token_data.user_id, selected, date_from, date_to)
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    elif format == "jsonl":
+        content = service.stream_jsonl(token_data.user_id, selected, date_from, date_to)
+    else:
+        content = service.stream_csv(token_data.user_id, selected, date_from, date_to)
+
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=invoices.{format}"},
     )
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.components.base.schemas import Base
@@ -6,6 +6,12 @@ from app.components.base.schemas import Base
 
 class InvoiceSchema(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Serves the per-user listing, export and (created_at, id) cursor as an index range scan
+        Index("ix_invoices_user_created_id", "user_id", "created_at", "id"),
+        # One invoice per attachment; also serves the per-attachment dedupe lookup during sync
+        Index("uq_invoices_user_email_file", "user_id", "email_id", "file_name", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -24,3 +30,26 @@ class InvoiceSchema(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     user = relationship("UserSchema", back_populates="invoices")
+
+
+class ExtractionCacheSchema(Base):
+    __tablename__ = "extraction_cache"
+
+    content_hash = Column(String, primary_key=True)  # SHA-256 of the PDF bytes
+    extractor = Column(String, primary_key=True)  # "<kind>:<version>"
+    result = Column(Text, nullable=False)  # ExtractedInvoice JSON
+    size = Column(Integer, nullable=False)
+    last_used_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+
+class VendorTemplateSchema(Base):
+    __tablename__ = "vendor_templates"
+    __table_args__ = (UniqueConstraint("user_id", "fingerprint"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    fingerprint = Column(String, nullable=False)  # Hash of the normalized header lines
+    vendor_name = Column(String, nullable=True)
+    template = Column(Text, nullable=False)  # VendorTemplate JSON
+    hits = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -1,11 +1,47 @@
+import base64
 import csv
 import io
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Iterator
+from sqlalchemy import select, tuple_, Integer, Float, DateTime
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 from app.components.invoice.schema import InvoiceSchema
 from app.components.invoice.model import InvoiceCreate, InvoiceResponse, InvoiceListResponse
+from app.core.cache import TTLCache
+from app.core.config import get_settings
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
+settings = get_settings()
+
+# Invoice count per user, so paging doesn't recount on every request
+_count_cache = TTLCache(ttl=settings.invoice_count_cache_secs)
+
+# Rows per bulk INSERT statement and commit
+BULK_INSERT_CHUNK = 500
+# Email IDs per IN (...) lookup, well under SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+# Rows fetched from the database per exported chunk
+EXPORT_BATCH_SIZE = 1000
+
+# Exportable invoice columns, in export order, and their CSV headers
+EXPORT_COLUMNS = {
+    "id": "ID",
+    "vendor_name": "Vendor Name",
+    "invoice_number": "Invoice Number",
+    "invoice_date": "Invoice Date",
+    "total_amount": "Total Amount",
+    "currency": "Currency",
+    "due_date": "Due Date",
+    "email_subject": "Email Subject",
+    "email_date": "Email Date",
+    "extraction_mode": "Extraction Mode",
+    "file_name": "File Name",
+    "created_at": "Created At",
+}
 
 
 class InvoiceService:
@@ -20,9 +56,43 @@ class InvoiceService:
         self.db.add(invoice)
         self.db.commit()
         self.db.refresh(invoice)
+        _count_cache.delete(user_id)
         logger.info(f"Created invoice {invoice.id} for user {user_id}")
         return invoice
 
+    def bulk_create(self, user_id: int, items: list[InvoiceCreate]) -> int:
+        """Insert invoices with one statement and commit per chunk, skipping attachments already stored.
+
+        Conflicts on the unique (user_id, email_id, file_name) index are ignored,
+        so concurrent syncs of the same label can't create duplicates. Returns
+        the number of rows inserted.
+        """
+        inserted = 0
+        for start in range(0, len(items), BULK_INSERT_CHUNK):
+            rows = [{"user_id": user_id, **item.model_dump()} for item in items[start:start + BULK_INSERT_CHUNK]]
+            stmt = insert(InvoiceSchema).on_conflict_do_nothing(
+                index_elements=["user_id", "email_id", "file_name"]
+            )
+            inserted += self.db.connection().execute(stmt, rows).rowcount
+            self.db.commit()
+
+        if items:
+            _count_cache.delete(user_id)
+            logger.info(f"Created {inserted} invoices for user {user_id}")
+        return inserted
+
+    def get_processed_keys(self, user_id: int, email_ids: list[str]) -> set[tuple[str, str | None]]:
+        """(email_id, file_name) pairs already stored for the given emails, in one query per chunk."""
+        keys = set()
+        email_ids = list(set(email_ids))
+        for start in range(0, len(email_ids), LOOKUP_CHUNK):
+            rows = self.db.query(InvoiceSchema.email_id, InvoiceSchema.file_name).filter(
+                InvoiceSchema.user_id == user_id,
+                InvoiceSchema.email_id.in_(email_ids[start:start + LOOKUP_CHUNK]),
+            ).all()
+            keys.update((email_id, file_name) for email_id, file_name in rows)
+        return keys
+
     def get_by_id(self, invoice_id: int, user_id: int) -> InvoiceSchema | None:
         """Get invoice by ID for specific user."""
         return self.db.query(InvoiceSchema).filter(
@@ -40,19 +110,45 @@ class InvoiceService:
             query = query.filter(InvoiceSchema.file_name == file_name)
         return query.first()
 
-    def list_invoices(self, user_id: int, page: int = 1, limit: int = 20) -> InvoiceListResponse:
-        """List invoices with pagination."""
-        offset = (page - 1) * limit
+    def list_invoices(
+        self, user_id: int, page: int | None = 1, limit: int = 20,
+        cursor: str | None = None, include_total: bool = True,
+    ) -> InvoiceListResponse:
+        """List invoices newest first, by cursor or by page number.
+
+        A cursor continues right after the last invoice of the previous page
+        using the (user_id, created_at, id) index, so every page costs the same.
+        Page numbers still work but skip rows with OFFSET. Raises ValueError for
+        an invalid cursor.
+        """
         query = self.db.query(InvoiceSchema).filter(InvoiceSchema.user_id == user_id)
+        ordered = query.order_by(InvoiceSchema.created_at.desc(), InvoiceSchema.id.desc())
+
+        if cursor:
+            created_at, invoice_id = _decode_cursor(cursor)
+            ordered = ordered.filter(tuple_(InvoiceSchema.created_at, InvoiceSchema.id) < (created_at, invoice_id))
+            page = None
+        else:
+            ordered = ordered.offset((page - 1) * limit)
 
-        total = query.count()
-        items = query.order_by(InvoiceSchema.created_at.desc()).offset(offset).limit(limit).all()
+        # One extra row tells whether there's a next page
+        items = ordered.limit(limit + 1).all()
+        next_cursor = _encode_cursor(items[limit - 1]) if len(items) > limit else None
+        items = items[:limit]
+
+        total = None
+        if include_total:
+            total = _count_cache.get(user_id)
+            if total is None:
+                total = query.count()
+                _count_cache.set(user_id, total)
 
         return InvoiceListResponse(
             items=[InvoiceResponse.model_validate(i) for i in items],
             total=total,
             page=page,
             limit=limit,
+            next_cursor=next_cursor,
         )
 
     def delete(self, invoice_id: int, user_id: int) -> bool:
@@ -61,41 +157,162 @@ class InvoiceService:
         if invoice:
             self.db.delete(invoice)
             self.db.commit()
+            _count_cache.delete(user_id)
             logger.info(f"Deleted invoice {invoice_id}")
             return True
         return False
 
-    def export_csv(self, user_id: int) -> str:
-        """Export all invoices to CSV string."""
-        invoices = self.db.query(InvoiceSchema).filter(
-            InvoiceSchema.user_id == user_id
-        ).order_by(InvoiceSchema.created_at.desc()).all()
-
+    def stream_csv(
+        self, user_id: int, columns: list[str] | None = None,
+        date_from: date | None = None, date_to: date | None = None,
+    ) -> Iterator[str]:
+        """Export invoices as CSV, yielding a chunk per batch of rows."""
+        columns = columns or list(EXPORT_COLUMNS)
         output = io.StringIO()
         writer = csv.writer(output)
+        writer.writerow([EXPORT_COLUMNS[name] for name in columns])
+
+        for rows in self._iter_export_batches(user_id, columns, date_from, date_to):
+            for row in rows:
+                writer.writerow([_csv_value(value) for value in row])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        if output.tell():
+            yield output.getvalue()
+
+    def stream_jsonl(
+        self, user_id: int, columns: list[str] | None = None,
+        date_from: date | None = None, date_to: date | None = None,
+    ) -> Iterator[str]:
+        """Export invoices as JSON Lines with typed values, yielding a chunk per batch of rows."""
+        columns = columns or list(EXPORT_COLUMNS)
+        for rows in self._iter_export_batches(user_id, columns, date_from, date_to):
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+            )
+
+    def stream_parquet(
+        self, user_id: int, columns: list[str] | None = None,
+        date_from: date | None = None, date_to: date | None = None,
+    ) -> Iterator[bytes]:
+        """Export invoices as Parquet, writing a row group per batch of rows.
 
-        # Header
-        writer.writerow([
-            "ID", "Vendor Name", "Invoice Number", "Invoice Date",
-            "Total Amount", "Currency", "Due Date", "Email Subject",
-            "Email Date", "Extraction Mode", "File Name", "Created At"
+        Raises ImportError up front if pyarrow isn't installed.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = columns or list(EXPORT_COLUMNS)
+        schema = pa.schema([
+            (name, _arrow_type(pa, getattr(InvoiceSchema, name).type)) for name in columns
         ])
 
-        # Data
-        for inv in invoices:
-            writer.writerow([
-                inv.id,
-                inv.vendor_name or "",
-                inv.invoice_number or "",
-                inv.invoice_date or "",
-                inv.total_amount or "",
-                inv.currency,
-                inv.due_date or "",
-                inv.email_subject or "",
-                inv.email_date.isoformat() if inv.email_date else "",
-                inv.extraction_mode or "",
-                inv.file_name or "",
-                inv.created_at.isoformat() if inv.created_at else "",
-            ])
-
-        return output.getvalue()
+        def generate():
+            sink = _ChunkSink()
+            with pq.ParquetWriter(sink, schema) as writer:
+                for rows in self._iter_export_batches(user_id, columns, date_from, date_to):
+                    writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema))
+                    yield sink.drain()
+            yield sink.drain()
+
+        return generate()
+
+    def _iter_export_batches(
+        self, user_id: int, columns: list[str], date_from: date | None, date_to: date | None,
+    ) -> Iterator[list[tuple]]:
+        """Yield batches of the selected columns, filtered by email date in SQL.
+
+        Only the requested columns are selected and rows are fetched in batches,
+        so memory stays flat however many invoices the user has. The session is
+        closed once the export finishes, since streaming outlives the request's
+        dependency scope.
+        """
+        query = select(*[getattr(InvoiceSchema, name) for name in columns]).where(
+            InvoiceSchema.user_id == user_id
+        )
+        if date_from:
+            query = query.where(InvoiceSchema.email_date >= datetime.combine(date_from, time.min))
+        if date_to:
+            # Inclusive of the whole end day
+            query = query.where(InvoiceSchema.email_date < datetime.combine(date_to + timedelta(days=1), time.min))
+        query = query.order_by(InvoiceSchema.created_at.desc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        try:
+            for rows in self.db.execute(query).partitions():
+                yield rows
+        finally:
+            self.db.close()
+
+
+class _ChunkSink:
+    """Write-only file that hands back what was written since the last drain.
+
+    pyarrow records offsets from tell(), so it counts every byte ever written.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _encode_cursor(invoice: InvoiceSchema) -> str:
+    """Opaque cursor pointing just past an invoice in (created_at, id) order."""
+    data = json.dumps([invoice.created_at.isoformat(), invoice.id])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, invoice_id = json.loads(data)
+        return datetime.fromisoformat(created_at), int(invoice_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _csv_value(value) -> str:
+    """Format a column value for CSV: blanks for NULL, ISO 8601 for datetimes."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _arrow_type(pa, column_type):
+    """Arrow type for an invoice column's SQLAlchemy type."""
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
@@ -0,0 +1,13 @@
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# IDs of users known to exist with Gmail connected, so auth can skip the DB.
+# UserService invalidates an entry whenever that user's tokens change.
+principal_cache = TTLCache(ttl=settings.principal_cache_secs, maxsize=settings.principal_cache_size)
+
+
+def invalidate_principal(user_id: int):
+    """Force the next request from this user to re-check the database."""
+    principal_cache.delete(user_id)
@@ -15,4 +15,4 @@ class UserResponse(BaseModel):
 
 
 class ExtractionModeUpdate(BaseModel):
-    mode: Literal["local", "openai"]
+    mode: Literal["local", "openai", "hybrid"]
@@ -12,6 +12,7 @@ class UserSchema(Base):
     name = Column(String, nullable=True)
     google_access_token = Column(String, nullable=True)
     google_refresh_token = Column(String, nullable=True)
+    google_token_expiry = Column(DateTime, nullable=True)  # naive UTC, as google-auth keeps it
     extraction_mode = Column(String, default="local")
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
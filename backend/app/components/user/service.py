@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from app.components.user.schema import UserSchema
 from app.components.user.model import UserResponse
+from app.components.user.cache import invalidate_principal
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -21,7 +22,15 @@ class UserService:
         """Get user by email."""
         return self.db.query(UserSchema).filter(UserSchema.email == email).first()
 
-    def create_or_update(self, email: str, name: str | None, access_token: str, refresh_token: str, extraction_mode: str = "local") -> UserSchema:
+    def create_or_update(
+        self,
+        email: str,
+        name: str | None,
+        access_token: str,
+        refresh_token: str,
+        extraction_mode: str = "local",
+        token_expiry: datetime | None = None,
+    ) -> UserSchema:
         """Create or update user with OAuth tokens."""
         user = self.get_by_email(email)
 
@@ -29,6 +38,7 @@ class UserService:
             user.name = name
             user.google_access_token = access_token
             user.google_refresh_token = refresh_token
+            user.google_token_expiry = token_expiry
             user.extraction_mode = extraction_mode
             user.updated_at = datetime.now(timezone.utc)
             logger.info(f"Updated user: {email}")
@@ -38,6 +48,7 @@ class UserService:
                 name=name,
                 google_access_token=access_token,
                 google_refresh_token=refresh_token,
+                google_token_expiry=token_expiry,
                 extraction_mode=extraction_mode
             )
             self.db.add(user)
@@ -45,6 +56,7 @@ class UserService:
 
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.id)
         return user
 
     def update_extraction_mode(self, user_id: int, mode: str) -> UserSchema | None:
@@ -58,16 +70,25 @@ class UserService:
             logger.info(f"Updated extraction mode for user {user_id}: {mode}")
         return user
 
-    def update_tokens(self, user_id: int, access_token: str, refresh_token: str | None = None) -> UserSchema | None:
-        """Update user's OAuth tokens."""
+    def update_tokens(
+        self,
+        user_id: int,
+        access_token: str,
+        refresh_token: str | None = None,
+        token_expiry: datetime | None = None,
+    ) -> UserSchema | None:
+        """Update user's OAuth tokens, and the access token's expiry when known."""
         user = self.get_by_id(user_id)
         if user:
             user.google_access_token = access_token
             if refresh_token:
                 user.google_refresh_token = refresh_token
+            if token_expiry:
+                user.google_token_expiry = token_expiry
             user.updated_at = datetime.now(timezone.utc)
             self.db.commit()
             self.db.refresh(user)
+            invalidate_principal(user_id)
         return user
 
     def clear_tokens(self, user_id: int) -> bool:
@@ -76,8 +97,10 @@ class UserService:
         if user:
             user.google_access_token = None
             user.google_refresh_token = None
+            user.google_token_expiry = None
             user.updated_at = datetime.now(timezone.utc)
             self.db.commit()
+            invalidate_principal(user_id)
             logger.info(f"Cleared tokens for user {user_id}")
             return True
         return False
@@ -8,7 +8,18 @@ class Settings(BaseSettings):
     """Application configuration."""
 
     database_url: str = Field(default="sqlite:///./invoices.db")
+    # SQLite pragmas applied to every connection
+    db_journal_mode: str = Field(default="WAL")
+    db_synchronous: str = Field(default="NORMAL")
+    db_busy_timeout_ms: int = Field(default=5000)
+    db_cache_size_kb: int = Field(default=65536)
+    db_mmap_size_mb: int = Field(default=256)
+    db_temp_store: str = Field(default="MEMORY")
+    db_pool_size: int = Field(default=5)
+    db_max_overflow: int = Field(default=10)
     secret_key: str = Field(default="your-secret-key-change-in-production")
+    # Comma-separated old secret keys; tokens encrypted with them are re-encrypted on next use
+    secret_key_previous: str = Field(default="")
 
     # JWT
     jwt_secret: str = Field(default="yuftyuergfergfegrfehufhguiehgiuehrgjhrthgoehgkjhfg")
@@ -19,9 +30,49 @@ class Settings(BaseSettings):
     google_client_id: Optional[str] = Field(default=None)
     google_client_secret: Optional[str] = Field(default=None)
     google_redirect_uri: str = Field(default="http://localhost:8000/auth/google/callback")
+    # Access tokens are refreshed this long before they expire
+    google_token_refresh_skew_secs: int = Field(default=300)
+
+    # Gmail sync
+    gmail_fetch_workers: int = Field(default=8)
+    gmail_requests_per_second: float = Field(default=40.0)
+    gmail_max_retries: int = Field(default=3)
+    gmail_batch_size: int = Field(default=50)
+    gmail_page_size: int = Field(default=100)
+    gmail_client_cache_size: int = Field(default=256)
+    # Labels are served from cache this long, then stale (refreshed in the background) up to the max
+    gmail_label_cache_secs: int = Field(default=300)
+    gmail_label_max_stale_secs: int = Field(default=86400)
+    sync_job_workers: int = Field(default=2)
+    sync_job_retention_mins: int = Field(default=60)
+
+    # PDF extraction (0 workers runs extraction on the sync thread)
+    pdf_max_pages: int = Field(default=10)
+    pdf_max_chars: int = Field(default=20000)
+    extraction_workers: int = Field(default=0)
+    extraction_max_tasks_per_child: int = Field(default=50)
+    extraction_timeout_secs: float = Field(default=60.0)
+    extraction_cache_enabled: bool = Field(default=True)
+    extraction_cache_max_mb: int = Field(default=64)
+    vendor_templates_enabled: bool = Field(default=True)
+    # Templates are learned only from results whose required fields all score at least this
+    vendor_template_min_confidence: float = Field(default=0.6)
+    # Hybrid mode sends a PDF to OpenAI when a required field scores below this
+    hybrid_confidence_threshold: float = Field(default=0.6)
 
     # OpenAI
     openai_api_key: Optional[str] = Field(default=None)
+    openai_base_url: Optional[str] = Field(default=None)
+    openai_max_concurrency: int = Field(default=8)
+    openai_tokens_per_minute: int = Field(default=200000)
+    openai_max_retries: int = Field(default=5)
+
+    # Authenticated users are re-checked against the database after this long
+    principal_cache_secs: int = Field(default=60)
+    principal_cache_size: int = Field(default=10000)
+
+    # How long an invoice list's total count is reused before recounting
+    invoice_count_cache_secs: int = Field(default=30)
 
     # Frontend
     frontend_url: str = Field(default="http://localhost:3000")
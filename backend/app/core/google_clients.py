@@ -0,0 +1,40 @@
+from datetime import datetime
+from functools import lru_cache
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document, Resource
+from app.core.config import get_settings
+
+settings = get_settings()
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+
+@lru_cache(maxsize=None)
+def _discovery_document(api: str, version: str) -> str:
+    """Discovery document shipped with googleapiclient, read from disk once."""
+    document = discovery_cache.get_static_doc(api, version)
+    if document is None:
+        raise ValueError(f"No static discovery document for {api} {version}")
+    return document
+
+
+def build_client(api: str, version: str, credentials: Credentials | None = None, http=None) -> Resource:
+    """Build a Google API client from the cached discovery document, with no network fetch."""
+    return build_from_document(_discovery_document(api, version), credentials=credentials, http=http)
+
+
+def make_credentials(
+    access_token: str | None,
+    refresh_token: str | None,
+    expiry: datetime | None = None,
+) -> Credentials:
+    """OAuth credentials for this app's Google client; `expiry` is naive UTC."""
+    return Credentials(
+        token=access_token,
+        refresh_token=refresh_token,
+        token_uri=TOKEN_URI,
+        client_id=settings.google_client_id,
+        client_secret=settings.google_client_secret,
+        expiry=expiry,
+    )
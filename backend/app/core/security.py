@@ -1,16 +1,30 @@
 import base64
 import hashlib
-from cryptography.fernet import Fernet
+from functools import lru_cache
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from app.core.config import get_settings
 
 
-def _get_fernet() -> Fernet:
-    """Returns Fernet instance using secret key."""
-    settings = get_settings()
-    key = hashlib.sha256(settings.secret_key.encode()).digest()
+@lru_cache(maxsize=16)
+def _derive_fernet(secret: str) -> Fernet:
+    """Fernet for a secret, derived once per secret."""
+    key = hashlib.sha256(secret.encode()).digest()
     return Fernet(base64.urlsafe_b64encode(key))
 
 
+@lru_cache(maxsize=4)
+def _build_fernet(secret_key: str, previous_keys: str) -> MultiFernet:
+    """Encrypts with the current key, decrypts with the current or any previous key."""
+    secrets = [secret_key] + [key.strip() for key in previous_keys.split(",") if key.strip()]
+    return MultiFernet([_derive_fernet(secret) for secret in secrets])
+
+
+def _get_fernet() -> MultiFernet:
+    """Returns the cached MultiFernet for the configured keys."""
+    settings = get_settings()
+    return _build_fernet(settings.secret_key, settings.secret_key_previous)
+
+
 def encrypt_token(token: str) -> str:
     """Encrypts a token string."""
     if not token:
@@ -25,3 +39,23 @@ def decrypt_token(encrypted: str) -> str:
         return ""
     fernet = _get_fernet()
     return fernet.decrypt(encrypted.encode()).decode()
+
+
+def needs_rotation(encrypted: str) -> bool:
+    """Whether a token was encrypted with a previous key rather than the current one."""
+    settings = get_settings()
+    if not encrypted or not settings.secret_key_previous:
+        return False
+    try:
+        _derive_fernet(settings.secret_key).decrypt(encrypted.encode())
+        return False
+    except InvalidToken:
+        return True
+
+
+def rotate_token(encrypted: str) -> str:
+    """Re-encrypts a token under the current key."""
+    if not encrypted:
+        return ""
+    fernet = _get_fernet()
+    return fernet.rotate(encrypted.encode()).decode()
@@ -1,17 +1,49 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import get_settings
 
 settings = get_settings()
 
+_url = make_url(settings.database_url)
+_pool_args = {}
+if _url.get_backend_name() == "sqlite" and _url.database not in (None, "", ":memory:"):
+    # In-memory SQLite uses a single-connection pool that takes no sizing
+    _pool_args = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    **_pool_args,
 )
 
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """Apply the SQLite performance profile to each new connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.db_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.db_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.db_cache_size_kb)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.db_mmap_size_mb) * 1024 * 1024}")
+    cursor.execute(f"PRAGMA temp_store={settings.db_temp_store}")
+    cursor.close()
+
+
+if _url.get_backend_name() == "sqlite":
+    event.listen(engine, "connect", _apply_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def ensure_indexes(metadata):
+    """Create indexes declared after their tables already existed (create_all skips those)."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 def get_db():
     """Dependency injection for database session."""
     db = SessionLocal()
@@ -3,10 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
 from app.core.logger import get_logger
-from app.database import engine
+from app.database import engine, ensure_indexes
+from app.migrations import run_migrations
 from app.components.base.schemas import Base
 from app.components.user.schema import UserSchema
-from app.components.invoice.schema import InvoiceSchema
+from app.components.invoice.schema import InvoiceSchema, ExtractionCacheSchema, VendorTemplateSchema
+from app.components.gmail.schema import GmailSyncStateSchema
 from app.components.auth.router import auth_router
 from app.components.user.router import user_router
 from app.components.gmail.router import gmail_router
@@ -17,6 +19,8 @@ settings = get_settings()
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+ensure_indexes(Base.metadata)
 
 app = FastAPI(
     title="Gmail Invoice Extractor",
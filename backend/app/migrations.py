@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Schema changes create_all can't make on existing databases, applied once each in order.
+# New databases get the same schema from create_all, so each step must be a no-op there.
+
+
+def _dedupe_invoice_attachments(conn: Connection):
+    """Keep the first invoice per (user, email, file) and make the key unique."""
+    deleted = conn.execute(text(
+        "DELETE FROM invoices WHERE id NOT IN ("
+        "SELECT MIN(id) FROM invoices GROUP BY user_id, email_id, file_name)"
+    )).rowcount
+    if deleted:
+        logger.info(f"Removed {deleted} duplicate invoices")
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_invoices_user_email_file "
+        "ON invoices (user_id, email_id, file_name)"
+    ))
+
+
+def _add_column(conn: Connection, table: str, column: str, column_type: str):
+    """Add a column unless create_all already made it."""
+    columns = {existing["name"] for existing in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+
+def _add_user_token_expiry(conn: Connection):
+    """Track when each user's Google access token expires."""
+    _add_column(conn, "users", "google_token_expiry", "DATETIME")
+
+
+def _add_sync_retry_messages(conn: Connection):
+    """Remember messages a sync failed on so the next incremental sync retries them."""
+    _add_column(conn, "gmail_sync_states", "retry_message_ids", "VARCHAR")
+
+
+MIGRATIONS = [
+    ("0001_unique_invoice_attachment", _dedupe_invoice_attachments),
+    ("0002_user_token_expiry", _add_user_token_expiry),
+    ("0003_sync_retry_messages", _add_sync_retry_messages),
+]
+
+
+def run_migrations(engine: Engine):
+    """Apply migrations that haven't run on this database yet."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR PRIMARY KEY, applied_at DATETIME)"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                {"name": name, "applied_at": datetime.now(timezone.utc)},
+            )
+        logger.info(f"Applied migration {name}")
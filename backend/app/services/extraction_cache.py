@@ -0,0 +1,195 @@
+import hashlib
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Iterator
+from sqlalchemy import delete, func, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.services.pdf_extractor import PDFExtractor, ExtractedInvoice
+from app.services.pdf_document import PDFDocument
+from app.components.invoice.schema import ExtractionCacheSchema
+from app.core.config import get_settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Eviction trims the cache to this fraction of its limit, so it doesn't run on every write
+EVICT_TO_FRACTION = 0.9
+# Writes between exact recounts of the cache size, to pick up other processes' writes
+SIZE_RECOUNT_INTERVAL = 50
+
+# This process's running estimate of the cache size in bytes (None until first counted)
+_estimated_bytes: int | None = None
+_writes_since_count = 0
+_estimate_lock = threading.Lock()
+
+
+def content_hash(pdf_content: bytes) -> str:
+    """SHA-256 hex digest of PDF bytes."""
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed extraction results keyed by PDF content hash, with LRU eviction."""
+
+    def __init__(self, db: Session, max_bytes: int | None = None):
+        self.db = db
+        self.max_bytes = max_bytes or settings.extraction_cache_max_mb * 1024 * 1024
+
+    def get_many(self, hashes: list[str], extractor: str) -> dict[str, ExtractedInvoice]:
+        """Look up cached results and mark them as recently used."""
+        if not hashes:
+            return {}
+
+        entries = self.db.query(ExtractionCacheSchema).filter(
+            ExtractionCacheSchema.extractor == extractor,
+            ExtractionCacheSchema.content_hash.in_(set(hashes)),
+        ).all()
+        if not entries:
+            return {}
+
+        now = datetime.now(timezone.utc)
+        results = {}
+        for entry in entries:
+            entry.last_used_at = now
+            results[entry.content_hash] = ExtractedInvoice.model_validate_json(entry.result)
+        self.db.commit()
+        return results
+
+    def put_many(self, results: dict[str, ExtractedInvoice], extractor: str):
+        """Store results, then evict least recently used entries over the size limit."""
+        if not results:
+            return
+
+        written = 0
+        for digest, extracted in results.items():
+            data = extracted.model_dump_json()
+            written += len(data)
+            self.db.merge(ExtractionCacheSchema(
+                content_hash=digest,
+                extractor=extractor,
+                result=data,
+                size=len(data),
+                last_used_at=datetime.now(timezone.utc),
+            ))
+        self.db.commit()
+        if self._may_be_over_limit(written):
+            self._evict()
+
+    def _may_be_over_limit(self, written: int) -> bool:
+        """Track the cache size from this process's writes; True when it's due an exact count."""
+        global _estimated_bytes, _writes_since_count
+        with _estimate_lock:
+            _writes_since_count += 1
+            if _estimated_bytes is None or _writes_since_count >= SIZE_RECOUNT_INTERVAL:
+                return True
+            # Overwritten entries are counted twice, which only brings the next count forward
+            _estimated_bytes += written
+            return _estimated_bytes > self.max_bytes
+
+    def _count(self) -> tuple[int, int]:
+        """Exact (bytes, entries) in the cache, which also resets the running estimate."""
+        global _estimated_bytes, _writes_since_count
+        total, count = self.db.query(
+            func.coalesce(func.sum(ExtractionCacheSchema.size), 0), func.count()
+        ).select_from(ExtractionCacheSchema).one()
+        with _estimate_lock:
+            _estimated_bytes = total
+            _writes_since_count = 0
+        return total, count
+
+    def _evict(self):
+        """If the cache is over its limit, delete least recently used entries down to the low-water mark."""
+        total, count = self._count()
+        if total <= self.max_bytes:
+            return
+
+        table = ExtractionCacheSchema.__table__
+        rowid = literal_column("rowid")
+        target = int(self.max_bytes * EVICT_TO_FRACTION)
+        deleted = 0
+        while total > target and count:
+            # Enough of the oldest entries, at the average entry size, to get down to the target
+            limit = max(1, math.ceil((total - target) * count / total))
+            oldest = select(rowid).select_from(table).order_by(table.c.last_used_at).limit(limit)
+            deleted += self.db.execute(delete(table).where(rowid.in_(oldest))).rowcount
+            total, count = self._count()
+        self.db.commit()
+        logger.info(f"Evicted {deleted} extraction cache entries")
+
+
+class CachedExtractor(PDFExtractor):
+    """Consults the extraction cache before delegating to another extractor."""
+
+    def __init__(self, extractor: PDFExtractor, cache: ExtractionCache):
+        self.extractor = extractor
+        self.cache = cache
+        self.kind = extractor.kind
+        self.version = extractor.version
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.kind}:{self.version}"
+
+    def extract(self, pdf_content: bytes) -> ExtractedInvoice:
+        """Extract invoice data, reusing a cached result for identical PDFs."""
+        result = next(self.extract_many([pdf_content]))
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
+        """Extract invoice data from an opened PDF, reusing a cached result for identical bytes."""
+        digest = content_hash(document.content)
+        cached = self.cache.get_many([digest], self.cache_key)
+        if digest in cached:
+            return cached[digest]
+
+        result = self.extractor.extract_document(document)
+        if self._has_fields(result):
+            try:
+                self.cache.put_many({digest: result}, self.cache_key)
+            except Exception as e:
+                self.cache.db.rollback()
+                logger.error(f"Extraction cache write error: {e}")
+        return result
+
+    def extract_many(self, pdf_contents: list[bytes]) -> Iterator[ExtractedInvoice | Exception]:
+        """Serve cached PDFs, extract each distinct uncached PDF once, and yield in input order."""
+        hashes = [content_hash(pdf_content) for pdf_content in pdf_contents]
+        results: dict[str, ExtractedInvoice | Exception] = self.cache.get_many(hashes, self.cache_key)
+        if results:
+            logger.info(f"Extraction cache hits: {sum(1 for h in hashes if h in results)}/{len(hashes)}")
+
+        misses = {}
+        for digest, pdf_content in zip(hashes, pdf_contents):
+            if digest not in results:
+                misses.setdefault(digest, pdf_content)
+
+        extracted = {}
+        for digest, result in zip(misses, self.extractor.extract_many(list(misses.values()))):
+            results[digest] = result
+            # Don't cache failures or empty results so they're retried next sync
+            if isinstance(result, ExtractedInvoice) and self._has_fields(result):
+                extracted[digest] = result
+
+        try:
+            self.cache.put_many(extracted, self.cache_key)
+        except Exception as e:
+            self.cache.db.rollback()
+            logger.error(f"Extraction cache write error: {e}")
+
+        for digest in hashes:
+            yield results[digest]
+
+    def _has_fields(self, extracted: ExtractedInvoice) -> bool:
+        """Check whether any invoice field was extracted."""
+        return any([
+            extracted.vendor_name,
+            extracted.invoice_number,
+            extracted.invoice_date,
+            extracted.total_amount is not None,
+            extracted.due_date,
+        ])
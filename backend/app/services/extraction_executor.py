@@ -0,0 +1,203 @@
+import itertools
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator
+
+from app.services.pdf_extractor import PDFExtractor, ExtractedInvoice
+from app.services.pdf_document import PDFDocument
+from app.core.config import get_settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# How often a waiting caller checks whether the PDF it waits on has run too long
+POLL_SECS = 0.5
+# A PDF whose pool was killed under it is resubmitted at most this many times
+MAX_RESUBMITS = 2
+
+_worker_start_queue = None
+
+
+def _init_worker(start_queue):
+    global _worker_start_queue
+    _worker_start_queue = start_queue
+
+
+def _run_task(task_id: int, extractor: PDFExtractor, pdf_content: bytes) -> ExtractedInvoice:
+    """Runs in a worker: report that the task started, then extract the PDF."""
+    _worker_start_queue.put(task_id)
+    return extractor.extract(pdf_content)
+
+
+class _ExtractionPool:
+    """A process pool whose workers report when they pick up each PDF."""
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        # Written synchronously, so a worker stuck in C code has still reported its start
+        self.start_queue = context.SimpleQueue()
+        self._started: dict[int, float] = {}
+        self._started_lock = threading.Lock()
+        self._task_ids = itertools.count()
+        kwargs = {}
+        if sys.version_info >= (3, 11):
+            # Recycle workers to contain pdfplumber memory growth
+            kwargs["max_tasks_per_child"] = settings.extraction_max_tasks_per_child
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.extraction_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.start_queue,),
+            **kwargs,
+        )
+
+    def submit(self, extractor: PDFExtractor, pdf_content: bytes) -> tuple[int, Future]:
+        task_id = next(self._task_ids)
+        return task_id, self.executor.submit(_run_task, task_id, extractor, pdf_content)
+
+    def running_for(self, task_id: int) -> float | None:
+        """Seconds since a worker picked the task up, or None if it's still queued."""
+        with self._started_lock:
+            # Timestamped on arrival, so the clock starts at most one poll late
+            while not self.start_queue.empty():
+                self._started[self.start_queue.get()] = time.monotonic()
+            started = self._started.get(task_id)
+        return None if started is None else time.monotonic() - started
+
+    def forget(self, task_id: int):
+        with self._started_lock:
+            self._started.pop(task_id, None)
+
+
+_pool: _ExtractionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _ExtractionPool:
+    """Returns the process-wide extraction pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _ExtractionPool()
+            logger.info(f"Started PDF extraction pool with {settings.extraction_workers} workers")
+        return _pool
+
+
+def _reset_pool(broken: _ExtractionPool):
+    """Replace a pool whose worker died so later extractions get a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _terminate_pool(pool: _ExtractionPool):
+    """Kill a pool's workers and replace it; a task already running can't be cancelled otherwise."""
+    processes = list((pool.executor._processes or {}).values())
+    _reset_pool(pool)
+    for process in processes:
+        process.terminate()
+
+
+def _finished(future: Future) -> bool:
+    """Whether a future holds its own result, rather than the error of a pool that was killed."""
+    if not future.done() or future.cancelled():
+        return False
+    return not isinstance(future.exception(), BrokenProcessPool)
+
+
+class ProcessPoolExtractor(PDFExtractor):
+    """Runs another extractor in a shared process pool, off the GIL-bound sync thread.
+
+    The wrapped extractor must be picklable.
+    """
+
+    def __init__(self, extractor: PDFExtractor, timeout: float | None = None):
+        self.extractor = extractor
+        self.timeout = timeout or settings.extraction_timeout_secs
+        self.kind = extractor.kind
+        self.version = extractor.version
+
+    def extract(self, pdf_content: bytes) -> ExtractedInvoice:
+        """Extract invoice data from PDF in a worker process."""
+        result = next(self.extract_many([pdf_content]))
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
+        """Extract an already opened PDF in this process, since it can't be sent to a worker."""
+        return self.extractor.extract_document(document)
+
+    def extract_documents(self, documents: Iterable[PDFDocument]) -> Iterator[ExtractedInvoice | Exception]:
+        """Send opened PDFs' bytes to the pool; workers parse them again, but in parallel."""
+        return self.extract_many([document.content for document in documents])
+
+    def extract_many(self, pdf_contents: list[bytes]) -> Iterator[ExtractedInvoice | Exception]:
+        """Submit all PDFs at once and yield results in input order.
+
+        Each PDF gets `timeout` seconds from when a worker picks it up; time
+        spent queued behind other PDFs, from this job or others sharing the
+        pool, doesn't count. A PDF that runs past it yields a TimeoutError and
+        the pool's workers are killed, the only way to stop a PDF that hangs
+        the parser. PDFs that were queued or running in the killed pool, this
+        job's and other jobs', are resubmitted to a fresh pool by the callers
+        waiting on them, up to MAX_RESUBMITS times each.
+        """
+        pool = _get_pool()
+        tasks = [(pool, *pool.submit(self.extractor, pdf_content)) for pdf_content in pdf_contents]
+        resubmits = [0] * len(tasks)
+
+        for index in range(len(tasks)):
+            while True:
+                task_pool, task_id, future = tasks[index]
+                try:
+                    result = self._wait(task_pool, task_id, future)
+                except (BrokenProcessPool, CancelledError) as e:
+                    # Some PDF took the pool down, in this job or another one sharing it
+                    _reset_pool(task_pool)
+                    if self._resubmit(tasks, resubmits, index, pdf_contents, task_pool):
+                        continue
+                    logger.error(f"PDF extraction pool broke: {e}")
+                    result = e
+                except Exception as e:
+                    result = e
+                finally:
+                    task_pool.forget(task_id)
+                break
+            yield result
+
+    def _resubmit(self, tasks: list, resubmits: list[int], index: int, pdf_contents: list[bytes],
+                  broken: _ExtractionPool) -> bool:
+        """Move this job's unfinished PDFs from a broken pool to a fresh one.
+
+        Returns whether the PDF at `index` was resubmitted.
+        """
+        pool = _get_pool()
+        for later in range(index, len(tasks)):
+            task_pool, task_id, future = tasks[later]
+            if task_pool is broken and not _finished(future) and resubmits[later] < MAX_RESUBMITS:
+                broken.forget(task_id)
+                tasks[later] = (pool, *pool.submit(self.extractor, pdf_contents[later]))
+                resubmits[later] += 1
+        return tasks[index][0] is not broken
+
+    def _wait(self, pool: _ExtractionPool, task_id: int, future: Future) -> ExtractedInvoice:
+        """Wait for a PDF's result, killing the pool if it has run longer than the timeout."""
+        while True:
+            try:
+                return future.result(timeout=POLL_SECS)
+            except TimeoutError:
+                if future.done():
+                    return future.result()
+            running_for = pool.running_for(task_id)
+            if running_for is not None and running_for > self.timeout:
+                logger.error(f"PDF extraction timed out after {self.timeout}s, restarting extraction pool")
+                _terminate_pool(pool)
+                raise TimeoutError(f"Extraction timed out after {self.timeout}s")
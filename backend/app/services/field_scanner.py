@@ -0,0 +1,170 @@
+import re
+from typing import Iterator
+from pydantic import BaseModel
+
+# Patterns per field, in precedence order: an earlier pattern wins wherever it matches.
+# Each is keyed by the anchor its match has to start with, and carries the confidence
+# (0-1) given to a value it finds: explicit labels score high, loose ones low.
+_DATE = r"(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})"
+
+INVOICE_NUMBER_PATTERNS = [
+    ("invoice", r"invoice\s*#?\s*:?\s*([A-Z0-9\-]+)", 0.8),
+    ("inv", r"inv\s*#?\s*:?\s*([A-Z0-9\-]+)", 0.7),
+    ("invoice", r"invoice\s+number\s*:?\s*([A-Z0-9\-]+)", 0.9),
+    ("invoice", r"invoice\s+no\.?\s*:?\s*([A-Z0-9\-]+)", 0.9),
+    ("#", r"#\s*([A-Z0-9\-]{4,})", 0.5),
+]
+
+INVOICE_DATE_PATTERNS = [
+    ("invoice", rf"invoice\s+date\s*:?\s*{_DATE}", 0.9),
+    ("date", rf"date\s*:?\s*{_DATE}", 0.8),
+    ("date", rf"dated?\s*:?\s*{_DATE}", 0.8),
+]
+
+# Unlabelled date, used for the invoice date only when no labelled one is found
+BARE_DATE_PATTERN = _DATE
+BARE_DATE_CONFIDENCE = 0.4
+
+DUE_DATE_PATTERNS = [
+    ("due", rf"due\s+date\s*:?\s*{_DATE}", 0.9),
+    ("due", rf"due\s*:?\s*{_DATE}", 0.7),
+    ("payment", rf"payment\s+due\s*:?\s*{_DATE}", 0.9),
+]
+
+# Every match of every amount pattern is a candidate; the largest wins, with the
+# best confidence of any pattern that found it
+AMOUNT_PATTERNS = [
+    ("total", r"total\s+(?:amount|due)?\s*:?\s*\$?\s*([\d,]+\.?\d*)", 0.8),
+    ("grand", r"grand\s+total\s*:?\s*\$?\s*([\d,]+\.?\d*)", 0.9),
+    ("amount", r"amount\s+due\s*:?\s*\$?\s*([\d,]+\.?\d*)", 0.9),
+    ("balance", r"balance\s+due\s*:?\s*\$?\s*([\d,]+\.?\d*)", 0.8),
+    ("total", r"total\s*:?\s*\$?\s*([\d,]+\.?\d*)", 0.7),
+]
+
+# Currency markers in precedence order (case-sensitive)
+CURRENCIES = [
+    ("$", "USD"),
+    ("€", "EUR"),
+    ("£", "GBP"),
+    ("¥", "JPY"),
+    ("₹", "INR"),
+    ("USD", "USD"),
+    ("EUR", "EUR"),
+    ("GBP", "GBP"),
+    ("INR", "INR"),
+]
+
+# One pass over the text finds every position where a field pattern could start.
+# Each search resumes one character after the last anchor's start rather than its
+# end, so an anchor beginning inside another ("grandue", "amountotal") is still
+# found. "invoice" also covers the "inv" patterns since both begin at the same position.
+_ANCHORS = r"invoice|inv|#|date|due|payment|total|grand|amount|balance"
+
+# The anchors are matched case-sensitively against lowercased text: a plain literal
+# alternation lets the regex engine skip ahead on first characters, which IGNORECASE
+# prevents. Dotless and dotted I also match "i" under IGNORECASE.
+_ANCHOR_RE = re.compile(_ANCHORS)
+_ANCHOR_IGNORECASE_RE = re.compile(_ANCHORS, re.IGNORECASE)
+_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i"})
+
+_BARE_DATE_RE = re.compile(BARE_DATE_PATTERN, re.IGNORECASE)
+
+
+def _build_rules() -> dict[str, list[tuple[str, int, re.Pattern, float]]]:
+    """Map each anchor to the (field, precedence, compiled pattern, confidence) rules starting there."""
+    rules: dict[str, list[tuple[str, int, re.Pattern, float]]] = {}
+    fields = {
+        "invoice_number": INVOICE_NUMBER_PATTERNS,
+        "invoice_date": INVOICE_DATE_PATTERNS,
+        "due_date": DUE_DATE_PATTERNS,
+        "total_amount": AMOUNT_PATTERNS,
+    }
+    for field, patterns in fields.items():
+        for precedence, (anchor, pattern, confidence) in enumerate(patterns):
+            rule = (field, precedence, re.compile(pattern, re.IGNORECASE), confidence)
+            rules.setdefault(anchor, []).append(rule)
+            if anchor == "inv":
+                rules.setdefault("invoice", []).append(rule)
+    return rules
+
+
+_RULES = _build_rules()
+
+
+class ScannedFields(BaseModel):
+    """Invoice fields found by the pattern scanner."""
+    invoice_number: str | None = None
+    invoice_date: str | None = None
+    due_date: str | None = None
+    total_amount: float | None = None
+    currency: str = "USD"
+    confidence: dict[str, float] = {}  # per found field, 0-1
+
+
+def _iter_anchors(text: str) -> Iterator[tuple[int, str]]:
+    """Yield (position, lowercase keyword) for every anchor in the text."""
+    if "\u0130" in text or "\u0131" in text:
+        text = text.translate(_FOLD)
+    folded = text.lower()
+    if len(folded) == len(text):
+        search, text = _ANCHOR_RE.search, folded
+    else:
+        # Lowercasing changed offsets; fall back to matching the original text
+        search = _ANCHOR_IGNORECASE_RE.search
+
+    match = search(text)
+    while match:
+        start = match.start()
+        yield start, match.group().lower()
+        match = search(text, start + 1)
+
+
+def scan_fields(text: str) -> ScannedFields:
+    """Find invoice number, dates and total in a single pass over the text."""
+    best: dict[str, tuple[int, str, float]] = {}
+    amounts: dict[float, float] = {}
+
+    for pos, keyword in _iter_anchors(text):
+        for field, precedence, pattern, confidence in _RULES[keyword]:
+            if field == "total_amount":
+                match = pattern.match(text, pos)
+                if match:
+                    try:
+                        val = float(match.group(1).replace(",", ""))
+                        if val > 0:
+                            amounts[val] = max(amounts.get(val, 0.0), confidence)
+                    except ValueError:
+                        pass
+                continue
+
+            # Keep the first match of the highest-precedence pattern
+            current = best.get(field)
+            if current is not None and current[0] <= precedence:
+                continue
+            match = pattern.match(text, pos)
+            if match:
+                best[field] = (precedence, match.group(1).strip(), confidence)
+
+    if "invoice_date" not in best:
+        match = _BARE_DATE_RE.search(text)
+        if match:
+            best["invoice_date"] = (len(INVOICE_DATE_PATTERNS), match.group(1).strip(), BARE_DATE_CONFIDENCE)
+
+    confidence = {field: found[2] for field, found in best.items()}
+    # "Invoice Number: 123" lets the first pattern capture the word "Number"
+    number = best.get("invoice_number")
+    if number and not any(c.isdigit() for c in number[1]):
+        confidence["invoice_number"] = number[2] / 2
+    total_amount = None
+    if amounts:
+        total_amount = max(amounts)
+        confidence["total_amount"] = amounts[total_amount]
+
+    return ScannedFields(
+        invoice_number=best["invoice_number"][1] if "invoice_number" in best else None,
+        invoice_date=best["invoice_date"][1] if "invoice_date" in best else None,
+        due_date=best["due_date"][1] if "due_date" in best else None,
+        total_amount=total_amount,
+        currency=next((code for marker, code in CURRENCIES if marker in text), "USD"),
+        confidence=confidence,
+    )
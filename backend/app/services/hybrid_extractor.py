@@ -0,0 +1,134 @@
+import threading
+from typing import Iterable, Iterator
+from pydantic import BaseModel, computed_field
+from app.services.pdf_extractor import PDFExtractor, ExtractedInvoice
+from app.services.pdf_document import PDFDocument
+from app.core.config import get_settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Fields the local result must find confidently to skip OpenAI
+REQUIRED_FIELDS = ["vendor_name", "invoice_number", "invoice_date", "total_amount"]
+MERGED_FIELDS = ["vendor_name", "invoice_number", "invoice_date", "total_amount", "due_date"]
+
+
+class EscalationMetrics(BaseModel):
+    """Process-wide counts of hybrid extractions and escalations to OpenAI."""
+    documents: int = 0
+    escalated: int = 0
+    # How often each required field triggered an escalation
+    fields: dict[str, int] = {}
+
+    @computed_field
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalated / self.documents if self.documents else 0.0
+
+
+_metrics = EscalationMetrics()
+_metrics_lock = threading.Lock()
+
+
+def get_escalation_metrics() -> EscalationMetrics:
+    """Snapshot of the hybrid escalation counters."""
+    with _metrics_lock:
+        return _metrics.model_copy(deep=True)
+
+
+def _record(documents: int, weak_fields: list[list[str]]) -> float:
+    """Add a batch to the counters and return the overall escalation rate."""
+    with _metrics_lock:
+        _metrics.documents += documents
+        for fields in weak_fields:
+            _metrics.escalated += 1
+            for field in fields:
+                _metrics.fields[field] = _metrics.fields.get(field, 0) + 1
+        return _metrics.escalation_rate
+
+
+class HybridExtractor(PDFExtractor):
+    """Local extraction first, escalating to OpenAI only for PDFs it isn't sure about.
+
+    Both tiers read the same PDFDocument, so an escalated PDF is parsed once.
+    """
+
+    kind = "hybrid"
+
+    def __init__(self, local: PDFExtractor, remote: PDFExtractor, threshold: float | None = None):
+        self.local = local
+        self.remote = remote
+        self.threshold = settings.hybrid_confidence_threshold if threshold is None else threshold
+        self.version = f"{local.kind}-{local.version}+{remote.kind}-{remote.version}"
+
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
+        """Extract locally, re-extracting with OpenAI when a required field is missing or weak."""
+        return next(self.extract_documents([document]))
+
+    def extract_many(self, pdf_contents: list[bytes]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract PDFs locally, then send the uncertain ones to OpenAI together."""
+        documents = [PDFDocument(pdf_content) for pdf_content in pdf_contents]
+        try:
+            yield from self.extract_documents(documents)
+        finally:
+            for document in documents:
+                document.close()
+
+    def extract_documents(self, documents: Iterable[PDFDocument]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract opened PDFs, yielding results in input order."""
+        documents = list(documents)
+        results = list(self.local.extract_documents(documents))
+
+        escalate = []
+        weak_fields = []
+        for index, result in enumerate(results):
+            weak = self._weak_fields(result)
+            if weak:
+                escalate.append(index)
+                weak_fields.append(weak)
+
+        rate = _record(len(documents), weak_fields)
+        if escalate:
+            logger.info(
+                f"Hybrid extraction: escalating {len(escalate)}/{len(documents)} PDFs to {self.remote.kind} "
+                f"(overall rate {rate:.1%})"
+            )
+
+        remote_results = self.remote.extract_documents([documents[i] for i in escalate])
+        for index, remote in zip(escalate, remote_results):
+            local = results[index]
+            if isinstance(remote, Exception):
+                logger.error(f"Hybrid escalation error, keeping local result: {remote}")
+                continue
+            results[index] = self._merge(local, remote)
+
+        yield from results
+
+    def _weak_fields(self, result: ExtractedInvoice | Exception) -> list[str]:
+        """Required fields the local result missed or scored below the threshold."""
+        if isinstance(result, Exception):
+            return ["error"]
+        if not result.raw_text.strip():
+            # Nothing to send; OpenAI would see the same empty text
+            return []
+        return [
+            field for field in REQUIRED_FIELDS
+            if getattr(result, field) is None or result.confidence.get(field, 0.0) < self.threshold
+        ]
+
+    def _merge(self, local: ExtractedInvoice | Exception, remote: ExtractedInvoice) -> ExtractedInvoice:
+        """Prefer OpenAI's fields, falling back to local ones it couldn't find."""
+        if isinstance(local, Exception):
+            return remote
+        merged = remote.model_copy()
+        confidence = {}
+        for field in MERGED_FIELDS:
+            if getattr(merged, field) is None and getattr(local, field) is not None:
+                setattr(merged, field, getattr(local, field))
+                if field in local.confidence:
+                    confidence[field] = local.confidence[field]
+        merged.confidence = confidence
+        merged.raw_text = local.raw_text or remote.raw_text
+        merged.pages_read = local.pages_read or remote.pages_read
+        return merged
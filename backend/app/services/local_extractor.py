@@ -1,129 +1,54 @@
 import re
-import io
-import pdfplumber
 from app.services.pdf_extractor import PDFExtractor, ExtractedInvoice
-from app.core.logger import get_logger
+from app.services.pdf_document import PDFDocument
+from app.services.field_scanner import scan_fields
+from app.core.config import get_settings
 
-logger = get_logger(__name__)
+settings = get_settings()
+
+NUMERIC_LINE_RE = re.compile(r"^[\d\s\-/]+$")
+
+# Vendor confidence by which of the first lines it came from
+VENDOR_LINE_CONFIDENCE = [0.7, 0.6, 0.5, 0.4, 0.3]
 
 
 class LocalExtractor(PDFExtractor):
     """Local PDF extraction using pdfplumber and regex patterns."""
 
-    def extract(self, pdf_content: bytes) -> ExtractedInvoice:
+    kind = "local"
+    version = "3"
+
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
         """Extract invoice data from PDF using pattern matching."""
-        text = self._extract_text(pdf_content)
+        pdf_text = document.text(settings.pdf_max_pages, settings.pdf_max_chars)
+        text = pdf_text.text
+        fields = scan_fields(text)
+        vendor_name, vendor_confidence = self._extract_vendor(text)
+
+        confidence = dict(fields.confidence)
+        if vendor_name:
+            confidence["vendor_name"] = vendor_confidence
 
         return ExtractedInvoice(
-            vendor_name=self._extract_vendor(text),
-            invoice_number=self._extract_invoice_number(text),
-            invoice_date=self._extract_date(text, "invoice"),
-            total_amount=self._extract_amount(text),
-            currency=self._extract_currency(text),
-            due_date=self._extract_date(text, "due"),
+            vendor_name=vendor_name,
+            invoice_number=fields.invoice_number,
+            invoice_date=fields.invoice_date,
+            total_amount=fields.total_amount,
+            currency=fields.currency,
+            due_date=fields.due_date,
             raw_text=text,
+            pages_read=pdf_text.pages_read,
+            confidence=confidence,
         )
 
-    def _extract_text(self, pdf_content: bytes) -> str:
-        """Extract text from PDF."""
-        text = ""
-        try:
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except Exception as e:
-            logger.error(f"PDF text extraction error: {e}")
-        return text
-
-    def _extract_vendor(self, text: str) -> str | None:
-        """Extract vendor/company name from first lines."""
+    def _extract_vendor(self, text: str) -> tuple[str | None, float]:
+        """Extract vendor/company name from first lines, with a confidence that drops further down."""
         lines = [l.strip() for l in text.split("\n") if l.strip()]
         if lines:
             # Usually vendor name is in the first few lines
-            for line in lines[:5]:
+            for index, line in enumerate(lines[:5]):
                 # Skip common header words
                 if line.lower() not in ["invoice", "tax invoice", "bill"]:
-                    if len(line) > 2 and not re.match(r"^[\d\s\-/]+$", line):
-                        return line
-        return None
-
-    def _extract_invoice_number(self, text: str) -> str | None:
-        """Extract invoice number."""
-        patterns = [
-            r"invoice\s*#?\s*:?\s*([A-Z0-9\-]+)",
-            r"inv\s*#?\s*:?\s*([A-Z0-9\-]+)",
-            r"invoice\s+number\s*:?\s*([A-Z0-9\-]+)",
-            r"invoice\s+no\.?\s*:?\s*([A-Z0-9\-]+)",
-            r"#\s*([A-Z0-9\-]{4,})",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return None
-
-    def _extract_date(self, text: str, date_type: str = "invoice") -> str | None:
-        """Extract date from text."""
-        if date_type == "due":
-            patterns = [
-                r"due\s+date\s*:?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-                r"due\s*:?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-                r"payment\s+due\s*:?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-            ]
-        else:
-            patterns = [
-                r"invoice\s+date\s*:?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-                r"date\s*:?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-                r"dated?\s*:?\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-                r"(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
-            ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return None
-
-    def _extract_amount(self, text: str) -> float | None:
-        """Extract total amount."""
-        patterns = [
-            r"total\s+(?:amount|due)?\s*:?\s*\$?\s*([\d,]+\.?\d*)",
-            r"grand\s+total\s*:?\s*\$?\s*([\d,]+\.?\d*)",
-            r"amount\s+due\s*:?\s*\$?\s*([\d,]+\.?\d*)",
-            r"balance\s+due\s*:?\s*\$?\s*([\d,]+\.?\d*)",
-            r"total\s*:?\s*\$?\s*([\d,]+\.?\d*)",
-        ]
-
-        amounts = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for m in matches:
-                try:
-                    val = float(m.replace(",", ""))
-                    if val > 0:
-                        amounts.append(val)
-                except:
-                    pass
-
-        # Return the largest amount found (likely the total)
-        return max(amounts) if amounts else None
-
-    def _extract_currency(self, text: str) -> str:
-        """Extract currency code."""
-        currencies = {
-            r"\$": "USD",
-            r"€": "EUR",
-            r"£": "GBP",
-            r"¥": "JPY",
-            r"₹": "INR",
-            r"USD": "USD",
-            r"EUR": "EUR",
-            r"GBP": "GBP",
-            r"INR": "INR",
-        }
-        for pattern, code in currencies.items():
-            if re.search(pattern, text):
-                return code
-        return "USD"
+                    if len(line) > 2 and not NUMERIC_LINE_RE.match(line):
+                        return line, VENDOR_LINE_CONFIDENCE[index]
+        return None, 0.0
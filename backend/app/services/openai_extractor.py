@@ -1,11 +1,23 @@
-import io
+import asyncio
 import json
-import pdfplumber
-from openai import OpenAI
+import random
+import threading
+import time
+from typing import Iterable, Iterator
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError
 from app.services.pdf_extractor import PDFExtractor, ExtractedInvoice
+from app.services.pdf_document import PDFDocument, PDFText
+from app.core.config import get_settings
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
+settings = get_settings()
+
+OPENAI_MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = "You are an invoice data extraction assistant. Extract structured data from invoice text."
+MAX_TOKENS = 500
+# Characters of invoice text sent in the prompt
+PROMPT_TEXT_CHARS = 4000
 
 EXTRACTION_PROMPT = """Extract the following information from this invoice text.
 Return a JSON object with these fields:
@@ -27,66 +39,149 @@ Return ONLY valid JSON, no other text."""
 class OpenAIExtractor(PDFExtractor):
     """OpenAI-powered PDF extraction for better accuracy."""
 
+    kind = "openai"
+    version = f"1-{OPENAI_MODEL}"
+
     def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, base_url=settings.openai_base_url)
+        # Retries are handled by _complete_async so they respect the shared throttle
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=settings.openai_base_url, max_retries=0)
 
-    def extract(self, pdf_content: bytes) -> ExtractedInvoice:
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
         """Extract invoice data using OpenAI."""
-        text = self._extract_text(pdf_content)
+        pdf_text = self._prompt_text(document)
 
-        if not text.strip():
-            return ExtractedInvoice(raw_text="")
+        if not pdf_text.text.strip():
+            return ExtractedInvoice(raw_text="", pages_read=pdf_text.pages_read)
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an invoice data extraction assistant. Extract structured data from invoice text."},
-                    {"role": "user", "content": EXTRACTION_PROMPT.format(text=text[:4000])},
-                ],
-                temperature=0,
-                max_tokens=500,
-            )
-
-            result_text = response.choices[0].message.content.strip()
-
-            # Parse JSON response
-            if result_text.startswith("```"):
-                result_text = result_text.split("```")[1]
-                if result_text.startswith("json"):
-                    result_text = result_text[4:]
-
-            data = json.loads(result_text)
+            response = self.client.chat.completions.create(**self._request_params(pdf_text.text))
+            return self._parse_response(response.choices[0].message.content, pdf_text)
+        except Exception as e:
+            logger.error(f"OpenAI extraction error: {e}")
+            return ExtractedInvoice(raw_text=pdf_text.text, pages_read=pdf_text.pages_read)
+
+    def extract_many(self, pdf_contents: list[bytes]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract PDFs with concurrent OpenAI requests, yielding results in input order."""
+        def documents():
+            for pdf_content in pdf_contents:
+                with PDFDocument(pdf_content) as document:
+                    yield document
+
+        return self.extract_documents(documents())
+
+    def extract_documents(self, documents: Iterable[PDFDocument]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract opened PDFs with concurrent OpenAI requests, yielding results in input order.
+
+        Each request is sent as soon as its document's text is ready, so later
+        documents are parsed while earlier requests are in flight.
+        """
+        loop = _get_loop()
+        futures = []
+        for document in documents:
+            try:
+                pdf_text = self._prompt_text(document)
+                futures.append(asyncio.run_coroutine_threadsafe(self._extract_async(pdf_text), loop))
+            except Exception as e:
+                futures.append(e)
+
+        for future in futures:
+            if isinstance(future, Exception):
+                yield future
+                continue
+            try:
+                yield future.result()
+            except Exception as e:
+                yield e
 
-            return ExtractedInvoice(
-                vendor_name=data.get("vendor_name"),
-                invoice_number=data.get("invoice_number"),
-                invoice_date=data.get("invoice_date"),
-                total_amount=self._parse_amount(data.get("total_amount")),
-                currency=data.get("currency", "USD") or "USD",
-                due_date=data.get("due_date"),
-                raw_text=text,
-            )
+    async def _extract_async(self, pdf_text: PDFText) -> ExtractedInvoice:
+        """Extract invoice data from PDF text on the shared event loop."""
+        if not pdf_text.text.strip():
+            return ExtractedInvoice(raw_text="", pages_read=pdf_text.pages_read)
 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {e}")
-            return ExtractedInvoice(raw_text=text)
+        try:
+            result_text = await self._complete_async(pdf_text.text)
+            return self._parse_response(result_text, pdf_text)
         except Exception as e:
             logger.error(f"OpenAI extraction error: {e}")
-            return ExtractedInvoice(raw_text=text)
+            return ExtractedInvoice(raw_text=pdf_text.text, pages_read=pdf_text.pages_read)
+
+    async def _complete_async(self, text: str) -> str:
+        """Run a chat completion within the concurrency and token budgets, backing off on 429/5xx."""
+        params = self._request_params(text)
+        throttle = _get_throttle()
+        # Rough estimate: ~4 characters per token, plus the completion budget
+        estimated_tokens = (len(SYSTEM_PROMPT) + len(params["messages"][1]["content"])) // 4 + MAX_TOKENS
+
+        attempt = 0
+        while True:
+            await throttle.reserve(estimated_tokens)
+            try:
+                async with throttle.semaphore:
+                    response = await self.async_client.chat.completions.create(**params)
+                return response.choices[0].message.content
+            except (RateLimitError, APIConnectionError, APIStatusError) as e:
+                retryable = not isinstance(e, APIStatusError) or e.status_code == 429 or e.status_code >= 500
+                if not retryable or attempt >= settings.openai_max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"OpenAI request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Exponential backoff with jitter, honouring Retry-After when the API sends one."""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return min(2 ** attempt, 60) + random.uniform(0, 1)
+
+    def _prompt_text(self, document: PDFDocument) -> PDFText:
+        """Extract only as much text as the prompt can use."""
+        return document.text(settings.pdf_max_pages, min(settings.pdf_max_chars, PROMPT_TEXT_CHARS))
+
+    def _request_params(self, text: str) -> dict:
+        """Chat completion parameters for an invoice text."""
+        return {
+            "model": OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": EXTRACTION_PROMPT.format(text=text[:PROMPT_TEXT_CHARS])},
+            ],
+            "temperature": 0,
+            "max_tokens": MAX_TOKENS,
+        }
+
+    def _parse_response(self, result_text: str, pdf_text: PDFText) -> ExtractedInvoice:
+        """Parse the model's JSON reply into an ExtractedInvoice."""
+        result_text = result_text.strip()
+
+        # Parse JSON response
+        if result_text.startswith("```"):
+            result_text = result_text.split("```")[1]
+            if result_text.startswith("json"):
+                result_text = result_text[4:]
 
-    def _extract_text(self, pdf_content: bytes) -> str:
-        """Extract text from PDF."""
-        text = ""
         try:
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except Exception as e:
-            logger.error(f"PDF text extraction error: {e}")
-        return text
+            data = json.loads(result_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parse error: {e}")
+            return ExtractedInvoice(raw_text=pdf_text.text, pages_read=pdf_text.pages_read)
+
+        return ExtractedInvoice(
+            vendor_name=data.get("vendor_name"),
+            invoice_number=data.get("invoice_number"),
+            invoice_date=data.get("invoice_date"),
+            total_amount=self._parse_amount(data.get("total_amount")),
+            currency=data.get("currency", "USD") or "USD",
+            due_date=data.get("due_date"),
+            raw_text=pdf_text.text,
+            pages_read=pdf_text.pages_read,
+        )
 
     def _parse_amount(self, value) -> float | None:
         """Parse amount from various formats."""
@@ -101,3 +196,56 @@ class OpenAIExtractor(PDFExtractor):
             except:
                 return None
         return None
+
+
+class _RequestThrottle:
+    """Concurrency limit and token-per-minute bucket shared by all OpenAI requests.
+
+    Only used from the extractor event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int):
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.tokens_per_minute = tokens_per_minute
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+
+    async def reserve(self, tokens: int):
+        """Wait until the token budget allows a request of this size."""
+        if self.tokens_per_minute <= 0:
+            return
+
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.tokens_per_minute, self._tokens + (now - self._updated) * self.tokens_per_minute / 60
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self._tokens) * 60 / self.tokens_per_minute)
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_throttle: _RequestThrottle | None = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the background event loop that runs async OpenAI requests."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="openai-extractor", daemon=True).start()
+        return _loop
+
+
+def _get_throttle() -> _RequestThrottle:
+    """Returns the shared request throttle. Called on the event loop thread."""
+    global _throttle
+    if _throttle is None:
+        _throttle = _RequestThrottle(settings.openai_max_concurrency, settings.openai_tokens_per_minute)
+    return _throttle
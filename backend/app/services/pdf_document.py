@@ -0,0 +1,108 @@
+import io
+import pdfplumber
+from pydantic import BaseModel
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PDFText(BaseModel):
+    """Text extracted from the leading pages of a PDF."""
+    text: str = ""
+    pages_read: list[int] = []  # 1-based page numbers
+    page_count: int = 0
+
+
+class PDFDocument:
+    """PDF bytes parsed once, with per-page text, words and tables memoized.
+
+    Share one instance between extractors in a pipeline so each page is
+    laid out by pdfplumber at most once. Use as a context manager, or call
+    close() when done.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self._pdf = None
+        self._opened = False
+        self._texts: dict[int, str] = {}
+        self._words: dict[int, list[dict]] = {}
+        self._tables: dict[int, list[list[list[str | None]]]] = {}
+
+    def __enter__(self) -> "PDFDocument":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the underlying pdfplumber document."""
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    @property
+    def pages(self) -> list:
+        """pdfplumber pages, or an empty list if the PDF can't be opened."""
+        if not self._opened:
+            self._opened = True
+            try:
+                self._pdf = pdfplumber.open(io.BytesIO(self.content))
+            except Exception as e:
+                logger.error(f"PDF open error: {e}")
+        return self._pdf.pages if self._pdf is not None else []
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def page_text(self, index: int) -> str:
+        """Text of a page (0-based)."""
+        if index not in self._texts:
+            try:
+                self._texts[index] = self.pages[index].extract_text() or ""
+            except Exception as e:
+                logger.error(f"PDF text extraction error on page {index + 1}: {e}")
+                self._texts[index] = ""
+        return self._texts[index]
+
+    def page_words(self, index: int) -> list[dict]:
+        """Words of a page (0-based) with their bounding boxes."""
+        if index not in self._words:
+            try:
+                self._words[index] = self.pages[index].extract_words()
+            except Exception as e:
+                logger.error(f"PDF word extraction error on page {index + 1}: {e}")
+                self._words[index] = []
+        return self._words[index]
+
+    def page_tables(self, index: int) -> list[list[list[str | None]]]:
+        """Tables of a page (0-based) as rows of cell text."""
+        if index not in self._tables:
+            try:
+                self._tables[index] = self.pages[index].extract_tables()
+            except Exception as e:
+                logger.error(f"PDF table extraction error on page {index + 1}: {e}")
+                self._tables[index] = []
+        return self._tables[index]
+
+    def text(self, max_pages: int | None = None, max_chars: int | None = None) -> PDFText:
+        """Text of the leading pages, stopping once the page or character budget is used up."""
+        parts = []
+        pages_read = []
+        chars = 0
+
+        for index in range(self.page_count):
+            if max_pages and len(pages_read) >= max_pages:
+                break
+            if max_chars and chars >= max_chars:
+                break
+
+            page_text = self.page_text(index)
+            pages_read.append(index + 1)
+            if page_text:
+                parts.append(page_text)
+                parts.append("\n")
+                chars += len(page_text) + 1
+
+        return PDFText(text="".join(parts), pages_read=pages_read, page_count=self.page_count)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
 from pydantic import BaseModel
+from app.services.pdf_document import PDFDocument
 
 
 class ExtractedInvoice(BaseModel):
@@ -11,12 +13,39 @@ class ExtractedInvoice(BaseModel):
     currency: str = "USD"
     due_date: str | None = None
     raw_text: str = ""
+    pages_read: list[int] = []
+    confidence: dict[str, float] = {}  # per field, 0-1; empty if the extractor doesn't score
 
 
 class PDFExtractor(ABC):
     """Base class for PDF extraction."""
 
-    @abstractmethod
+    # Identify the extractor in cache keys; bump version when output changes
+    kind: str = "base"
+    version: str = "1"
+
     def extract(self, pdf_content: bytes) -> ExtractedInvoice:
         """Extract invoice data from PDF content."""
+        with PDFDocument(pdf_content) as document:
+            return self.extract_document(document)
+
+    @abstractmethod
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
+        """Extract invoice data from an already opened PDF, possibly shared with other extractors."""
         pass
+
+    def extract_many(self, pdf_contents: list[bytes]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract several PDFs, yielding each result (or the error it raised) in input order."""
+        for pdf_content in pdf_contents:
+            try:
+                yield self.extract(pdf_content)
+            except Exception as e:
+                yield e
+
+    def extract_documents(self, documents: Iterable[PDFDocument]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract several opened PDFs, yielding each result (or the error it raised) in input order."""
+        for document in documents:
+            try:
+                yield self.extract_document(document)
+            except Exception as e:
+                yield e
@@ -0,0 +1,319 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.services.pdf_extractor import PDFExtractor, ExtractedInvoice
+from app.services.pdf_document import PDFDocument
+from app.components.invoice.schema import VendorTemplateSchema
+from app.core.config import get_settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Header lines hashed into a vendor fingerprint
+FINGERPRINT_LINES = 3
+# Fields a template must locate to be learned, and to be trusted when applied
+TEMPLATE_FIELDS = ["invoice_number", "invoice_date", "total_amount"]
+OPTIONAL_TEMPLATE_FIELDS = ["due_date"]
+TEMPLATE_CONFIDENCE = 0.9
+
+NON_LETTERS_RE = re.compile(r"[^a-z]+")
+# The whole words without digits at the end of a label, i.e. after any other field's value
+LABEL_TAIL_RE = re.compile(r"(?<!\S)[^\s\d]+(?:\s+[^\s\d]+)*$")
+
+# Value read right after a field's label, by field
+VALUE_PATTERNS = {
+    "invoice_number": re.compile(r"[\s:#.]*([A-Za-z0-9][A-Za-z0-9\-/]*)"),
+    "invoice_date": re.compile(
+        r"[\s:.]*(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}"
+        r"|[A-Za-z]{3,9}\.? \d{1,2},? \d{4}|\d{1,2} [A-Za-z]{3,9},? \d{4})"
+    ),
+    "total_amount": re.compile(r"[\s:]*[^\d\s]{0,3}\s*(\d[\d,]*(?:\.\d+)?)"),
+}
+VALUE_PATTERNS["due_date"] = VALUE_PATTERNS["invoice_date"]
+
+
+class FieldAnchor(BaseModel):
+    """A field's label text; its value is read right after the label."""
+    label: str  # lowercase
+
+
+class VendorTemplate(BaseModel):
+    """Where one vendor's invoices put each field."""
+    vendor_name: str | None = None
+    currency: str = "USD"
+    fields: dict[str, FieldAnchor] = {}
+
+
+def _header_lines(text: str) -> list[str]:
+    """The first non-empty lines, lowercased, with digits and punctuation removed."""
+    lines = []
+    for line in text.split("\n"):
+        normalized = NON_LETTERS_RE.sub(" ", line.lower()).strip()
+        if normalized:
+            lines.append(normalized)
+        if len(lines) >= FINGERPRINT_LINES:
+            break
+    return lines
+
+
+def fingerprint(text: str) -> str | None:
+    """Identify a vendor layout by its first lines, ignoring digits and punctuation."""
+    lines = _header_lines(text)
+    if not lines:
+        return None
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def document_fingerprint(document: PDFDocument) -> str | None:
+    """Fingerprint of a PDF's text, reading only as many pages as its header needs (usually one)."""
+    pages = []
+    for index in range(document.page_count):
+        if settings.pdf_max_pages and index >= settings.pdf_max_pages:
+            break
+        pages.append(document.page_text(index))
+        if len(_header_lines("\n".join(pages))) >= FINGERPRINT_LINES:
+            break
+    return fingerprint("\n".join(pages))
+
+
+def apply_template(template: VendorTemplate, text: str) -> ExtractedInvoice | None:
+    """Read each field after its label; None unless every required field is found."""
+    if not all(field in template.fields for field in TEMPLATE_FIELDS):
+        return None
+    # Generic header lines can give two vendors the same fingerprint; don't hand out the other's name
+    if template.vendor_name and not _mentions(text, template.vendor_name):
+        return None
+    lines = text.split("\n")
+    lowered = [line.lower() for line in lines]
+    values = {}
+
+    for field, anchor in template.fields.items():
+        value = _read_field(field, anchor.label, lines, lowered)
+        if value is None:
+            if field in TEMPLATE_FIELDS:
+                return None
+            continue
+        values[field] = value
+
+    try:
+        total_amount = float(values["total_amount"].replace(",", ""))
+    except ValueError:
+        return None
+
+    return ExtractedInvoice(
+        vendor_name=template.vendor_name,
+        invoice_number=values["invoice_number"],
+        invoice_date=values["invoice_date"],
+        total_amount=total_amount,
+        currency=template.currency,
+        due_date=values.get("due_date"),
+        raw_text=text,
+        confidence={
+            field: TEMPLATE_CONFIDENCE
+            for field in (["vendor_name"] if template.vendor_name else []) + list(values)
+        },
+    )
+
+
+def learn_template(extracted: ExtractedInvoice, text: str) -> VendorTemplate | None:
+    """Find the label in front of each extracted value; None if the result can't be reproduced."""
+    # Learn only from results the extractor is confident in (unscored results count as confident)
+    for field in TEMPLATE_FIELDS:
+        if getattr(extracted, field) is None:
+            return None
+        if extracted.confidence.get(field, 1.0) < settings.vendor_template_min_confidence:
+            return None
+
+    lines = text.split("\n")
+    template = VendorTemplate(vendor_name=extracted.vendor_name, currency=extracted.currency)
+    for field in TEMPLATE_FIELDS + OPTIONAL_TEMPLATE_FIELDS:
+        value = getattr(extracted, field)
+        if value is None:
+            continue
+        label = _find_label(field, value, lines)
+        if label is None:
+            if field in TEMPLATE_FIELDS:
+                return None
+            continue
+        template.fields[field] = FieldAnchor(label=label)
+
+    # Only keep templates that give back exactly what was extracted
+    applied = apply_template(template, text)
+    if applied is None:
+        return None
+    for field in template.fields:
+        if getattr(applied, field) != getattr(extracted, field):
+            return None
+    return template
+
+
+def _mentions(text: str, name: str) -> bool:
+    """Whether the text contains the name, ignoring case and spacing."""
+    return " ".join(name.lower().split()) in " ".join(text.lower().split())
+
+
+def _read_field(field: str, label: str, lines: list[str], lowered: list[str]) -> str | None:
+    """Value after the first occurrence of the label that starts a word."""
+    for line, lower in zip(lines, lowered):
+        start = lower.find(label)
+        while start != -1:
+            if start == 0 or not lower[start - 1].isalnum():
+                match = VALUE_PATTERNS[field].match(line, start + len(label))
+                if match:
+                    return match.group(1)
+            start = lower.find(label, start + 1)
+    return None
+
+
+def _find_label(field: str, value, lines: list[str]) -> str | None:
+    """Text on the value's line before it, if it's a usable label."""
+    if field == "total_amount":
+        candidates = [f"{value:,.2f}", f"{value:.2f}", f"{value:,.0f}", f"{value:.0f}", str(value)]
+    else:
+        candidates = [str(value)]
+
+    for line in lines:
+        for candidate in candidates:
+            index = line.find(candidate)
+            # The value must start a token, after a label that contains a word
+            if index <= 0 or line[index - 1].isalnum():
+                continue
+            # Drop anything up to another field's value, e.g. "invoice no: a1001 invoice date"
+            match = LABEL_TAIL_RE.search(line[:index].lower().rstrip(" \t:#.$€£¥₹"))
+            if match and any(c.isalpha() for c in match.group()):
+                return match.group()
+    return None
+
+
+class VendorTemplateStore:
+    """A user's learned vendor templates, loaded once and written through to SQLite."""
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self._templates: dict[str, VendorTemplate] | None = None
+        self._hits: dict[str, int] = {}
+
+    def get(self, key: str) -> VendorTemplate | None:
+        if self._templates is None:
+            rows = self.db.query(VendorTemplateSchema).filter(VendorTemplateSchema.user_id == self.user_id).all()
+            self._templates = {row.fingerprint: VendorTemplate.model_validate_json(row.template) for row in rows}
+        return self._templates.get(key)
+
+    def record_hit(self, key: str):
+        self._hits[key] = self._hits.get(key, 0) + 1
+
+    def save(self, learned: dict[str, VendorTemplate]):
+        """Store new or relearned templates and flush hit counts."""
+        if not learned and not self._hits:
+            return
+
+        now = datetime.now(timezone.utc)
+        keys = set(learned) | set(self._hits)
+        rows = {
+            row.fingerprint: row
+            for row in self.db.query(VendorTemplateSchema).filter(
+                VendorTemplateSchema.user_id == self.user_id,
+                VendorTemplateSchema.fingerprint.in_(keys),
+            ).all()
+        }
+        for key, template in learned.items():
+            row = rows.get(key)
+            if row is None:
+                row = VendorTemplateSchema(user_id=self.user_id, fingerprint=key, hits=0)
+                self.db.add(row)
+                rows[key] = row
+            row.vendor_name = template.vendor_name
+            row.template = template.model_dump_json()
+            row.updated_at = now
+            if self._templates is not None:
+                self._templates[key] = template
+        for key, hits in self._hits.items():
+            if key in rows:
+                rows[key].hits = (rows[key].hits or 0) + hits
+        self.db.commit()
+        self._hits = {}
+
+
+class TemplateExtractor(PDFExtractor):
+    """Extracts known vendors' PDFs from their learned templates, delegating the rest.
+
+    Complete results from the wrapped extractor teach the template for their
+    vendor, so the next PDF with the same header skips the generic patterns
+    and any OpenAI call.
+    """
+
+    def __init__(self, extractor: PDFExtractor, store: VendorTemplateStore):
+        self.extractor = extractor
+        self.store = store
+        self.kind = extractor.kind
+        self.version = extractor.version
+
+    def extract_document(self, document: PDFDocument) -> ExtractedInvoice:
+        """Extract invoice data from an opened PDF, using its vendor's template when known."""
+        result = next(self.extract_documents([document]))
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def extract_many(self, pdf_contents: list[bytes]) -> Iterator[ExtractedInvoice | Exception]:
+        """Extract PDFs, yielding results in input order."""
+        documents = [PDFDocument(pdf_content) for pdf_content in pdf_contents]
+        try:
+            yield from self.extract_documents(documents)
+        finally:
+            for document in documents:
+                document.close()
+
+    def extract_documents(self, documents: Iterable[PDFDocument]) -> Iterator[ExtractedInvoice | Exception]:
+        """Apply templates, then send the PDFs they can't handle to the wrapped extractor together.
+
+        Only the header page is read to look a PDF's vendor up, so a PDF without
+        a template isn't laid out here before a pooled extractor parses it again.
+        """
+        documents = list(documents)
+        results: list[ExtractedInvoice | Exception | None] = []
+        keys = []
+        misses = []
+
+        for index, document in enumerate(documents):
+            key = document_fingerprint(document)
+            keys.append(key)
+
+            template = self.store.get(key) if key else None
+            extracted = None
+            if template:
+                pdf_text = document.text(settings.pdf_max_pages, settings.pdf_max_chars)
+                extracted = apply_template(template, pdf_text.text)
+                if extracted:
+                    extracted.pages_read = pdf_text.pages_read
+                    self.store.record_hit(key)
+            if not extracted:
+                misses.append(index)
+            results.append(extracted)
+
+        if len(misses) < len(documents):
+            logger.info(f"Vendor template hits: {len(documents) - len(misses)}/{len(documents)}")
+
+        learned = {}
+        inner_results = self.extractor.extract_documents([documents[i] for i in misses])
+        for index, result in zip(misses, inner_results):
+            results[index] = result
+            # Learn from the text the extractor read, which has the same page and character budget
+            if isinstance(result, ExtractedInvoice) and keys[index] and result.raw_text:
+                template = learn_template(result, result.raw_text)
+                if template:
+                    learned[keys[index]] = template
+
+        try:
+            self.store.save(learned)
+        except Exception as e:
+            self.store.db.rollback()
+            logger.error(f"Vendor template write error: {e}")
+
+        yield from results
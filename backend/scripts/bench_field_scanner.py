@@ -0,0 +1,159 @@
+"""Compare scan_fields with the per-field regex searches it replaced.
+
+Checks that both give the same fields on a synthetic corpus and on
+invoice-like texts, then times them. Run from backend/:
+
+    python -m scripts.bench_field_scanner
+"""
+import random
+import re
+import sys
+import timeit
+
+from app.services.field_scanner import scan_fields
+
+_DATE = r"(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})"
+_AMOUNT = r"\s*:?\s*\$?\s*([\d,]+\.?\d*)"
+
+
+# The LocalExtractor methods before the single-pass scanner, one search per pattern
+
+def baseline_invoice_number(text: str) -> str | None:
+    for pattern in [
+        r"invoice\s*#?\s*:?\s*([A-Z0-9\-]+)",
+        r"inv\s*#?\s*:?\s*([A-Z0-9\-]+)",
+        r"invoice\s+number\s*:?\s*([A-Z0-9\-]+)",
+        r"invoice\s+no\.?\s*:?\s*([A-Z0-9\-]+)",
+        r"#\s*([A-Z0-9\-]{4,})",
+    ]:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def baseline_date(text: str, date_type: str) -> str | None:
+    if date_type == "due":
+        patterns = [rf"due\s+date\s*:?\s*{_DATE}", rf"due\s*:?\s*{_DATE}", rf"payment\s+due\s*:?\s*{_DATE}"]
+    else:
+        patterns = [rf"invoice\s+date\s*:?\s*{_DATE}", rf"date\s*:?\s*{_DATE}", rf"dated?\s*:?\s*{_DATE}", _DATE]
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def baseline_amount(text: str) -> float | None:
+    amounts = []
+    for pattern in [
+        rf"total\s+(?:amount|due)?{_AMOUNT}",
+        rf"grand\s+total{_AMOUNT}",
+        rf"amount\s+due{_AMOUNT}",
+        rf"balance\s+due{_AMOUNT}",
+        rf"total{_AMOUNT}",
+    ]:
+        for value in re.findall(pattern, text, re.IGNORECASE):
+            try:
+                value = float(value.replace(",", ""))
+            except ValueError:
+                continue
+            if value > 0:
+                amounts.append(value)
+    return max(amounts) if amounts else None
+
+
+def baseline_currency(text: str) -> str:
+    for marker, code in [("$", "USD"), ("€", "EUR"), ("£", "GBP"), ("¥", "JPY"), ("₹", "INR"),
+                         ("USD", "USD"), ("EUR", "EUR"), ("GBP", "GBP"), ("INR", "INR")]:
+        if marker in text:
+            return code
+    return "USD"
+
+
+def baseline_scan(text: str) -> tuple:
+    return (
+        baseline_invoice_number(text),
+        baseline_date(text, "invoice"),
+        baseline_date(text, "due"),
+        baseline_amount(text),
+        baseline_currency(text),
+    )
+
+
+def single_pass_scan(text: str) -> tuple:
+    fields = scan_fields(text)
+    return (fields.invoice_number, fields.invoice_date, fields.due_date, fields.total_amount, fields.currency)
+
+
+WORDS = [
+    "invoice", "Invoice", "INVOICE", "inv", "Inv#", "#", "date", "Date:", "dated", "due", "Due Date",
+    "payment due", "total", "Total:", "TOTAL AMOUNT", "grand total", "amount due", "balance due", "$", "€",
+    "£", "¥", "₹", "USD", "EUR", "usd", "GBP", "INR", "number", "no.", "Qty", "Description", "Widget",
+    "tax", "subtotal", "ACME", "Ltd", ":", "-", "/", "thanks", "invoices", "reinvoiced", "Totals", "involve",
+    "gran", "Amoun", "Paymen", "İnvoice", "ınv",
+]
+
+
+def _token(rng: random.Random) -> str:
+    r = rng.random()
+    if r < 0.15:
+        return f"{rng.randint(1, 31)}/{rng.randint(1, 12)}/{rng.choice([24, 2024, 123, 20245])}"
+    if r < 0.22:
+        return f"{rng.randint(1, 12)}-{rng.randint(1, 31)}-{rng.randint(10, 2030)}"
+    if r < 0.35:
+        return f"{rng.randint(0, 99999):,}.{rng.randint(0, 99):02d}"
+    if r < 0.42:
+        return rng.choice(["INV-", "A", "X9-", ""]) + str(rng.randint(0, 999999))
+    return rng.choice(WORDS)
+
+
+def synthetic_text(rng: random.Random) -> str:
+    """Random lines of invoice keywords, dates and amounts, sometimes run together."""
+    lines = []
+    for _ in range(rng.randint(5, 80)):
+        separators = [" ", "  ", ""]
+        tokens = [_token(rng) for _ in range(rng.randint(1, 8))]
+        lines.append("".join(token + rng.choice(separators) for token in tokens))
+    return "\n".join(lines)
+
+
+def invoice_text(rng: random.Random, index: int) -> str:
+    """A plausible invoice with a header, line items and totals."""
+    items = "\n".join(
+        f"Widget {i} Qty {rng.randint(1, 9)} ${rng.randint(1, 999)}.00" for i in range(rng.randint(5, 60))
+    )
+    return (
+        f"ACME Corp\n123 Main St\nInvoice Number: INV-{index}\nInvoice Date: 01/02/2024\n"
+        f"Due Date: 03/02/2024\n{items}\nSubtotal: $1,000.00\nTax: $80.00\nTotal Amount: $1,080.00\nThank you"
+    )
+
+
+def main() -> int:
+    rng = random.Random(7)
+    corpora = {
+        "synthetic": [synthetic_text(rng) for _ in range(3000)],
+        "invoice-like": [invoice_text(rng, i) for i in range(500)],
+    }
+    edge_cases = ["Grandue: 12/01/2024", "Amountotal: 500.00 total: 3", "Paymentotal 900", "granDate: 01/01/2023"]
+
+    mismatches = 0
+    for text in edge_cases + [text for corpus in corpora.values() for text in corpus]:
+        expected, actual = baseline_scan(text), single_pass_scan(text)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH {text[:80]!r}\n  baseline:    {expected}\n  single pass: {actual}")
+    print(f"{mismatches} mismatches")
+
+    for name, corpus in corpora.items():
+        sample = corpus[:500]
+        baseline = timeit.timeit(lambda: [baseline_scan(text) for text in sample], number=3)
+        single_pass = timeit.timeit(lambda: [single_pass_scan(text) for text in sample], number=3)
+        print(f"{name}: baseline {baseline:.3f}s, single pass {single_pass:.3f}s ({baseline / single_pass:.2f}x)")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Access-token validation throughput, before and after the principal cache.
+
+"Before" is the previous dependency, which loaded the user row through a
+get_db session on every request. It is measured both as a direct call and
+as requests/s through the API. Exits non-zero if a logged-out user still
+gets through on a cached principal. Run from backend/:
+
+    python -m scripts.bench_principal_cache [--requests 2000]
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Settings are read at import, so point the app at a scratch database first
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+
+from fastapi import Depends, HTTPException, status  # noqa: E402
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.database import SessionLocal, engine, get_db  # noqa: E402
+from app.components.auth.auth_utils import TokenData, create_access_token, validate_token  # noqa: E402
+from app.components.auth.dependencies import oauth2_bearer, validate_access_token  # noqa: E402
+from app.components.user.cache import principal_cache  # noqa: E402
+from app.components.user.schema import UserSchema  # noqa: E402
+from app.components.user.service import UserService  # noqa: E402
+
+# Any authenticated endpoint that doesn't touch the database itself
+ENDPOINT = "/gmail/extraction-metrics"
+
+
+def baseline_validate_access_token(
+    http: HTTPAuthorizationCredentials = Depends(oauth2_bearer),
+    db: Session = Depends(get_db),
+) -> TokenData:
+    """validate_access_token as it was before the principal cache."""
+    token_data = validate_token(http.credentials)
+    if token_data.token_type != "access":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid token type")
+    user = db.query(UserSchema).filter(UserSchema.id == token_data.user_id).first()
+    if not user or not user.google_access_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return token_data
+
+
+def per_second(count: int, call) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        call()
+    return count / (time.perf_counter() - started)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    # Per-request log lines would dominate the timings
+    logging.disable(logging.CRITICAL)
+
+    with SessionLocal() as db:
+        user = UserService(db).create_or_update("bench@example.com", "Bench", "access", "refresh")
+        user_id, email = user.id, user.email
+    token = create_access_token(user_id, email)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def call_baseline():
+        sessions = get_db()
+        baseline_validate_access_token(credentials, next(sessions))
+        sessions.close()
+
+    def call_uncached():
+        principal_cache.clear()
+        validate_access_token(credentials)
+
+    print(f"Dependency calls ({args.requests * 2} each):")
+    for name, call in [
+        ("before (session per call)", call_baseline),
+        ("after, cache miss every call", call_uncached),
+        ("after, cached", lambda: validate_access_token(credentials)),
+    ]:
+        print(f"  {name:<30} {per_second(args.requests * 2, call):>8,.0f} validations/s")
+
+    client = TestClient(app)
+    print(f"Requests to {ENDPOINT} ({args.requests} each):")
+    app.dependency_overrides[validate_access_token] = baseline_validate_access_token
+    before = per_second(args.requests, lambda: client.get(ENDPOINT, headers=headers))
+    app.dependency_overrides.clear()
+    client.get(ENDPOINT, headers=headers)
+    after = per_second(args.requests, lambda: client.get(ENDPOINT, headers=headers))
+    print(f"  {'before':<30} {before:>8,.0f} req/s\n  {'after':<30} {after:>8,.0f} req/s")
+
+    # Logging out invalidates the cached principal
+    with SessionLocal() as db:
+        UserService(db).clear_tokens(user_id)
+    status_code = client.get(ENDPOINT, headers=headers).status_code
+    print(f"After logout: HTTP {status_code}")
+    return 0 if status_code == status.HTTP_401_UNAUTHORIZED else 1
+
+
+if __name__ == "__main__":
+    try:
+        exit_status = main()
+    finally:
+        engine.dispose()
+        shutil.rmtree(_db_dir, ignore_errors=True)
+    sys.exit(exit_status)
@@ -0,0 +1,156 @@
+"""Mixed read/write load against SQLite, before and after the performance profile.
+
+Each profile runs in its own process on a fresh scratch database. Writer
+threads bulk-insert invoice batches while reader threads page through
+invoices. Exits non-zero if the configured profile hits "database is
+locked" errors. Run from backend/:
+
+    python -m scripts.bench_sqlite_profile [--duration 5] [--writers 4] [--readers 8]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# SQLite's own settings, as connections were opened before the profile existed
+BASELINE_PROFILE = {
+    "DB_JOURNAL_MODE": "DELETE",
+    "DB_SYNCHRONOUS": "FULL",
+    "DB_CACHE_SIZE_KB": "2000",
+    "DB_MMAP_SIZE_MB": "0",
+    "DB_TEMP_STORE": "DEFAULT",
+}
+PROFILES = {
+    "baseline (DELETE/FULL)": BASELINE_PROFILE,
+    "configured profile": {},
+}
+
+USERS = 4
+BATCH_SIZE = 20
+
+
+def run_load(duration: float, writers: int, readers: int) -> dict:
+    """Run the load in this process against DATABASE_URL and return its counters."""
+    from sqlalchemy.exc import OperationalError
+
+    import app.main  # noqa: F401 - creates the tables, migrations and indexes
+    from app.core.config import get_settings
+    from app.database import SessionLocal
+    from app.components.user.schema import UserSchema
+    from app.components.invoice.model import InvoiceCreate
+    from app.components.invoice.service import InvoiceService
+
+    with SessionLocal() as db:
+        users = [UserSchema(email=f"user{i}@example.com") for i in range(USERS)]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+
+    stop = time.monotonic() + duration
+    lock = threading.Lock()
+    stats = {"write_batches": 0, "reads": 0, "locked": 0}
+    read_latencies = []
+
+    def writer(n: int):
+        with SessionLocal() as db:
+            service = InvoiceService(db)
+            batch = 0
+            while time.monotonic() < stop:
+                items = [
+                    InvoiceCreate(email_id=f"w{n}-{batch}-{i}", file_name="invoice.pdf", raw_text="x" * 500)
+                    for i in range(BATCH_SIZE)
+                ]
+                batch += 1
+                try:
+                    service.bulk_create(user_ids[n % USERS], items)
+                    with lock:
+                        stats["write_batches"] += 1
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        stats["locked"] += 1
+
+    def reader(n: int):
+        with SessionLocal() as db:
+            service = InvoiceService(db)
+            while time.monotonic() < stop:
+                started = time.perf_counter()
+                try:
+                    service.list_invoices(user_ids[n % USERS], page=1, limit=50, include_total=False)
+                    db.commit()
+                    with lock:
+                        stats["reads"] += 1
+                        read_latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        stats["locked"] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    read_latencies.sort()
+    settings = get_settings()
+    return {
+        "journal_mode": settings.db_journal_mode,
+        "synchronous": settings.db_synchronous,
+        "write_batches_per_sec": stats["write_batches"] / duration,
+        "reads_per_sec": stats["reads"] / duration,
+        "read_p99_ms": read_latencies[int(len(read_latencies) * 0.99)] * 1000 if read_latencies else None,
+        "locked": stats["locked"],
+    }
+
+
+def run_profile(overrides: dict, args) -> dict:
+    """Run the load in a child process so the profile's settings are read fresh."""
+    db_dir = tempfile.mkdtemp()
+    try:
+        env = {**os.environ, **overrides, "DATABASE_URL": f"sqlite:///{os.path.join(db_dir, 'bench.db')}"}
+        command = [
+            sys.executable, "-m", "scripts.bench_sqlite_profile", "--child",
+            "--duration", str(args.duration), "--writers", str(args.writers), "--readers", str(args.readers),
+        ]
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_load(args.duration, args.writers, args.readers)))
+        return 0
+
+    print(f"{args.writers} writers x {BATCH_SIZE}-row batches, {args.readers} readers, {args.duration:g}s each")
+    results = {}
+    for name, overrides in PROFILES.items():
+        result = run_profile(overrides, args)
+        results[name] = result
+        p99 = f"{result['read_p99_ms']:.1f}ms" if result["read_p99_ms"] is not None else "n/a"
+        print(
+            f"{name} [{result['journal_mode']}/{result['synchronous']}]: "
+            f"{result['write_batches_per_sec']:.0f} write batches/s, {result['reads_per_sec']:.0f} reads/s, "
+            f"read p99 {p99}, {result['locked']} 'database is locked' errors"
+        )
+
+    return 1 if results["configured profile"]["locked"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
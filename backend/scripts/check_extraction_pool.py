@@ -0,0 +1,88 @@
+"""Two sync jobs sharing the extraction pool, with and without a PDF that hangs.
+
+Runs with one worker, so each job's PDFs wait in the queue behind the
+other's. Queued time must not count toward the timeout. A PDF that really
+hangs must time out alone, and neither job may lose its other PDFs when the
+pool is killed to stop it. Exits non-zero on any unexpected result. Run from
+backend/:
+
+    python -m scripts.check_extraction_pool
+"""
+import os
+import sys
+import threading
+import time
+
+# Settings are read at import
+os.environ["EXTRACTION_WORKERS"] = "1"
+
+from app.services.extraction_executor import ProcessPoolExtractor  # noqa: E402
+from app.services.pdf_extractor import ExtractedInvoice, PDFExtractor  # noqa: E402
+
+PDF_SECS = 0.5
+TIMEOUT_SECS = 2.0
+HANG = b"hang"
+
+
+class SlowExtractor(PDFExtractor):
+    """Takes PDF_SECS per PDF and never returns for HANG."""
+
+    kind = "slow"
+    version = "1"
+
+    def extract(self, pdf_content: bytes) -> ExtractedInvoice:
+        time.sleep(3600 if pdf_content == HANG else PDF_SECS)
+        return ExtractedInvoice(invoice_number=pdf_content.decode())
+
+    def extract_document(self, document):
+        raise NotImplementedError
+
+
+def run_jobs(jobs: dict[str, list[bytes]]) -> dict[str, list]:
+    """Run each job's extract_many on its own thread at the same time."""
+    extractor = ProcessPoolExtractor(SlowExtractor(), timeout=TIMEOUT_SECS)
+    results = {}
+
+    def run(name: str, pdfs: list[bytes]):
+        results[name] = list(extractor.extract_many(pdfs))
+
+    threads = [threading.Thread(target=run, args=item) for item in jobs.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def check(scenario: str, jobs: dict[str, list[bytes]]) -> int:
+    started = time.perf_counter()
+    results = run_jobs(jobs)
+    print(f"{scenario} ({time.perf_counter() - started:.1f}s)")
+
+    failures = 0
+    for name, pdfs in jobs.items():
+        for pdf, result in zip(pdfs, results[name]):
+            if pdf == HANG:
+                ok = isinstance(result, TimeoutError)
+            else:
+                ok = isinstance(result, ExtractedInvoice) and result.invoice_number == pdf.decode()
+            if not ok:
+                failures += 1
+                print(f"  FAIL {name} {pdf.decode()}: {result!r}")
+        outcome = ", ".join(type(result).__name__ for result in results[name])
+        print(f"  {name}: {outcome}")
+    return failures
+
+
+def main() -> int:
+    def job(prefix: str, count: int, hang_at: int | None = None) -> list[bytes]:
+        return [HANG if i == hang_at else f"{prefix}{i}".encode() for i in range(count)]
+
+    failures = check("Queued behind another job, nothing hangs", {"A": job("a", 10), "B": job("b", 6)})
+    failures += check("One PDF hangs", {"A": job("a", 8, hang_at=2), "B": job("b", 8)})
+    print(f"{failures} unexpected results")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
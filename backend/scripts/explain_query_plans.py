@@ -0,0 +1,134 @@
+"""Check that service queries use indexes, via SQLite's EXPLAIN QUERY PLAN.
+
+Seeds a throwaway database, runs the invoice, user, sync state, extraction
+cache and vendor template queries, and prints the plan of every statement
+they issued. Exits non-zero if any plan scans a whole table, apart from the
+scans listed in ALLOWED_SCANS. Run from backend/:
+
+    python -m scripts.explain_query_plans
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+# Settings are read at import, so point the app at a scratch database first
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'explain.db')}"
+
+from datetime import date, datetime, timedelta  # noqa: E402
+import httplib2  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import app.main  # noqa: E402,F401 - creates the tables, migrations and indexes
+from app.database import SessionLocal, engine  # noqa: E402
+from app.components.user.schema import UserSchema  # noqa: E402
+from app.components.user.service import UserService  # noqa: E402
+from app.components.invoice.model import InvoiceCreate  # noqa: E402
+from app.components.invoice.schema import InvoiceSchema  # noqa: E402
+from app.components.invoice.service import InvoiceService  # noqa: E402
+from app.components.gmail.service import GmailSyncService  # noqa: E402
+from app.services.extraction_cache import ExtractionCache  # noqa: E402
+from app.services.pdf_extractor import ExtractedInvoice  # noqa: E402
+from app.services.vendor_templates import VendorTemplate, VendorTemplateStore  # noqa: E402
+
+# Full scans that are expected, by a fragment of their statement
+ALLOWED_SCANS = {
+    # ExtractionCache._count: sums entry sizes, only when the running estimate
+    # says the cache may be over its limit or a periodic recount is due
+    "sum(extraction_cache.size)": "size recount before eviction",
+}
+
+USERS = 20
+INVOICES = 5000
+
+
+def seed():
+    with SessionLocal() as db:
+        users = [UserSchema(email=f"user{i}@example.com") for i in range(USERS)]
+        db.add_all(users)
+        db.commit()
+        db.add_all([
+            InvoiceSchema(
+                user_id=users[i % USERS].id,
+                email_id=f"m{i}",
+                file_name="invoice.pdf",
+                email_date=datetime(2024, 1, 1) + timedelta(days=i % 300),
+                created_at=datetime(2024, 1, 1) + timedelta(minutes=i),
+            )
+            for i in range(INVOICES)
+        ])
+        db.commit()
+
+
+def run_service_queries():
+    with SessionLocal() as db:
+        invoices = InvoiceService(db)
+        first = invoices.list_invoices(1, page=3, limit=20)
+        invoices.list_invoices(1, cursor=first.next_cursor, limit=20, include_total=False)
+        invoices.get_by_id(5, 1)
+        invoices.get_by_email_id("m20", 1, "invoice.pdf")
+        invoices.get_by_email_id("m20", 1)
+        invoices.get_processed_keys(1, ["m20", "m40", "missing"])
+        invoices.bulk_create(1, [InvoiceCreate(email_id="new", file_name="new.pdf", extraction_mode="local")])
+        invoices.delete(invoices.get_by_email_id("new", 1).id, 1)
+        list(invoices.stream_csv(1, date_from=date(2024, 2, 1), date_to=date(2024, 3, 1)))
+        list(invoices.stream_jsonl(1))
+
+        users = UserService(db)
+        users.get_by_id(1)
+        users.get_by_email("user1@example.com")
+        users.update_tokens(1, "access", "refresh")
+
+        user = users.get_by_id(1)
+        GmailSyncService(db, user, http=httplib2.Http())._get_sync_state("INBOX")
+
+        cache = ExtractionCache(db, max_bytes=1)
+        cache.get_many(["abc"], "local:3")
+        cache.put_many({"abc": ExtractedInvoice(invoice_number="1")}, "local:3")
+
+        templates = VendorTemplateStore(db, 1)
+        templates.get("fingerprint")
+        templates.save({"fingerprint": VendorTemplate(vendor_name="ACME")})
+
+
+def main() -> int:
+    seed()
+
+    statements = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", collect)
+    run_service_queries()
+    event.remove(engine, "before_cursor_execute", collect)
+
+    failures = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            # Scans through an index or over a constant row don't read the table
+            scans = [step for step in plan if step.startswith("SCAN ") and "USING" not in step and "CONSTANT" not in step]
+            allowed = next((reason for fragment, reason in ALLOWED_SCANS.items() if fragment in statement), None)
+            if scans and allowed is None:
+                failures += 1
+                status = "FAIL"
+            elif scans:
+                status = "ok (allowed: " + allowed + ")"
+            else:
+                status = "ok"
+            print(f"{status:<6} {' '.join(statement.split())[:120]}\n       {'; '.join(plan)}")
+
+    print(f"{len(statements)} statements, {failures} with unexpected full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        status = main()
+    finally:
+        engine.dispose()
+        shutil.rmtree(_db_dir, ignore_errors=True)
+    sys.exit(status)
@@ -42,7 +42,7 @@ export default function Dashboard() {
   const [error, setError] = useState<string | null>(null);
 
   const [showModeModal, setShowModeModal] = useState(false);
-  const [newMode, setNewMode] = useState<"local" | "openai">("local");
+  const [newMode, setNewMode] = useState<"local" | "openai" | "hybrid">("local");
 
   // Delete confirmation modal state
   const [deleteModal, setDeleteModal] = useState<{ isOpen: boolean; invoiceId: number | null }>({
@@ -61,8 +61,9 @@ export default function Dashboard() {
     try {
       const data = await getInvoices(1, 300);
       setAllInvoices(data.items);
-      setTotalCount(data.total);
-      setTotalPages(Math.ceil(data.total / PAGE_SIZE));
+      const total = data.total ?? data.items.length;
+      setTotalCount(total);
+      setTotalPages(Math.ceil(total / PAGE_SIZE));
     } catch (err) {
       console.error("Failed to load invoices:", err);
     } finally {
@@ -211,7 +212,11 @@ export default function Dashboard() {
             <div className="text-right hidden sm:block">
               <div className="text-sm font-medium text-gray-900">{user?.name || user?.email}</div>
               <div className="text-xs text-gray-500">
-                {user?.extraction_mode === "openai" ? "AI Mode" : "Local Mode"}
+                {user?.extraction_mode === "openai"
+                  ? "AI Mode"
+                  : user?.extraction_mode === "hybrid"
+                  ? "Hybrid Mode"
+                  : "Local Mode"}
               </div>
             </div>
             <Button variant="secondary" onClick={handleLogout}>
@@ -234,7 +239,11 @@ export default function Dashboard() {
             <div className="flex items-center gap-2 bg-gray-50 px-3 py-2 rounded-lg">
               <span className="text-sm text-gray-600">Mode:</span>
               <span className="font-medium text-gray-900">
-                {user?.extraction_mode === "openai" ? "OpenAI" : "Local"}
+                {user?.extraction_mode === "openai"
+                  ? "OpenAI"
+                  : user?.extraction_mode === "hybrid"
+                  ? "Hybrid"
+                  : "Local"}
               </span>
               <button
                 onClick={() => setShowModeModal(true)}
@@ -355,6 +364,19 @@ export default function Dashboard() {
                   <p className="text-sm text-gray-500">Better accuracy</p>
                 </div>
               </label>
+              <label className="flex items-center gap-3 p-3 border rounded-lg cursor-pointer hover:bg-gray-50">
+                <input
+                  type="radio"
+                  name="newMode"
+                  checked={newMode === "hybrid"}
+                  onChange={() => setNewMode("hybrid")}
+                  className="accent-blue-600"
+                />
+                <div>
+                  <span className="font-medium">Hybrid Processing</span>
+                  <p className="text-sm text-gray-500">OpenAI only when needed</p>
+                </div>
+              </label>
             </div>
 
             <div className="flex gap-3">
@@ -5,7 +5,7 @@ import { Button } from "./ui/Button";
 import { getAuthUrl } from "@/lib/api";
 
 export function ConnectGmail() {
-  const [mode, setMode] = useState<"local" | "openai">("local");
+  const [mode, setMode] = useState<"local" | "openai" | "hybrid">("local");
   const [loading, setLoading] = useState(false);
 
   const handleConnect = async () => {
@@ -87,6 +87,34 @@ export function ConnectGmail() {
             </p>
           </div>
         </label>
+
+        <label
+          className={`flex items-start gap-3 p-4 border-2 rounded-xl cursor-pointer transition-all ${
+            mode === "hybrid"
+              ? "border-blue-500 bg-blue-50"
+              : "border-gray-200 hover:border-gray-300"
+          }`}
+        >
+          <input
+            type="radio"
+            name="mode"
+            value="hybrid"
+            checked={mode === "hybrid"}
+            onChange={() => setMode("hybrid")}
+            className="mt-1 accent-blue-600"
+          />
+          <div className="flex-1">
+            <div className="flex items-center gap-2">
+              <span className="font-semibold text-gray-900">Hybrid Processing</span>
+              <span className="px-2 py-0.5 bg-amber-100 text-amber-700 text-xs rounded-full">
+                Balanced
+              </span>
+            </div>
+            <p className="text-sm text-gray-500 mt-1">
+              Pattern matching first, OpenAI only for invoices it isn&apos;t sure about.
+            </p>
+          </div>
+        </label>
       </div>
 
       <Button onClick={handleConnect} loading={loading} className="w-full py-3 text-base">
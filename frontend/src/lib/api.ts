@@ -1,4 +1,4 @@
-import { User, Label, Invoice, InvoiceList, SyncResult } from "@/types";
+import { User, Label, Invoice, InvoiceList, SyncJob, SyncResult } from "@/types";
 import { getToken } from "./auth";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
@@ -74,12 +74,39 @@ export async function getLabels(): Promise<Label[]> {
   return response.json();
 }
 
-export async function syncEmails(labelId: string): Promise<SyncResult> {
+const SYNC_POLL_INTERVAL_MS = 2000;
+
+export async function getSyncJob(jobId: string): Promise<SyncJob> {
+  const response = await fetchWithAuth(`/gmail/sync/${jobId}`);
+  return response.json();
+}
+
+export async function syncEmails(
+  labelId: string,
+  onProgress?: (job: SyncJob) => void
+): Promise<SyncResult> {
   const response = await fetchWithAuth("/gmail/sync", {
     method: "POST",
     body: JSON.stringify({ label_id: labelId }),
   });
-  return response.json();
+  let job: SyncJob = await response.json();
+
+  // Sync runs in the background; poll until the job finishes
+  while (job.status === "queued" || job.status === "running") {
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_INTERVAL_MS));
+    job = await getSyncJob(job.job_id);
+  }
+
+  if (job.status === "failed") {
+    throw new Error(job.errors[0] || "Sync failed");
+  }
+
+  return {
+    emails_processed: job.emails_processed,
+    invoices_extracted: job.invoices_extracted,
+    errors: job.errors,
+  };
 }
 
 // Invoices
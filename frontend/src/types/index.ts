@@ -2,7 +2,7 @@ export interface User {
   id: number;
   email: string;
   name: string | null;
-  extraction_mode: "local" | "openai";
+  extraction_mode: "local" | "openai" | "hybrid";
   created_at: string;
 }
 
@@ -28,9 +28,10 @@ export interface Invoice {
 
 export interface InvoiceList {
   items: Invoice[];
-  total: number;
-  page: number;
+  total: number | null;
+  page: number | null;
   limit: number;
+  next_cursor: string | null;
 }
 
 export interface SyncResult {
@@ -38,3 +39,12 @@ export interface SyncResult {
   invoices_extracted: number;
   errors: string[];
 }
+
+export interface SyncJob extends SyncResult {
+  job_id: string;
+  label_id: string;
+  status: "queued" | "running" | "completed" | "failed";
+  messages_scanned: number;
+  created_at: string;
+  finished_at: string | null;
+}